@@ -3,14 +3,59 @@ AI Agents for Tic-Tac-Toe
 Contains Agent, Human, RandomPlayer, and Teacher classes.
 """
 
+import mmap as _mmap
 import random
-from game_logic import EMPTY, PLAYER_X, PLAYER_O, DRAW, emptystate, gameover, enumstates, printboard
+import struct
+from array import array
+from game_logic import (EMPTY, PLAYER_X, PLAYER_O, DRAW, CELLS, POW3, NUM_STATES, WINNERS,
+                        LAST_MOVER, EMPTY_CELLS,
+                        emptystate, enumstates, printboard, encode, decode,
+                        canonical_codes)
+from value_table import ValueTable, BoundedValues, RoleSwitchedValues, state_index
+
+# Checkpoint layout: header, one float64 per slot of state_index(player,
+# symmetric) in code order, then (uint32 code, float64 value) pairs for
+# overflow states. Bit 0 of the flags byte marks a symmetry-reduced table.
+CHECKPOINT_MAGIC = b'TTTV'
+CHECKPOINT_VERSION = 1
+CHECKPOINT_HEADER = struct.Struct('<4sHBBddII')
+CHECKPOINT_SYMMETRIC = 1
+
+# Initial value tables keyed by (player, lossval, compact, symmetry), built once per process
+_INITIAL_VALUES = {}
 
 class Agent(object):
-    """Q-Learning Agent for Tic-Tac-Toe"""
-    
-    def __init__(self, player, verbose=False, lossval=-1, learning=True, alpha=0.99):
-        self.values = {}
+    """
+    Q-Learning Agent for Tic-Tac-Toe
+
+    values is a dict keyed by state code, or with compact=True a ValueTable
+    holding every state the agent can leave behind in one float array.
+    With symmetry=True all 8 rotations/reflections of a position share the
+    entry of its canonical code (canon maps code -> canonical code).
+    instrument is an optional Instrumentation receiving move, miss and
+    backup events; while it is None nothing is recorded.
+
+    game selects another board size / win length (a game_logic.Game); such
+    agents start with an empty table that fills as states are visited, and
+    max_states bounds it by evicting the least recently used states. game is
+    None for the classic 3x3 game, which uses the precomputed tables.
+
+    values, if given, is used as the table as is instead of building one.
+    """
+
+    __slots__ = ('values', 'player', 'verbose', 'lossval', 'learning', 'epsilon',
+                 'alpha', 'prevstate', 'prevscore', 'count', 'canon', 'instrument', 'game')
+
+    def __init__(self, player, verbose=False, lossval=-1, learning=True, alpha=0.99, compact=False,
+                 symmetry=False, game=None, max_states=None, values=None):
+        if game is not None and game.classic:
+            game = None
+        if game is not None and (compact or symmetry):
+            raise ValueError('compact and symmetry tables are only available for the 3x3 game')
+        cells = CELLS if game is None else game.cells
+        if max_states is not None and max_states <= cells:
+            raise ValueError('max_states must exceed the {0} cells of the board'.format(cells))
+        self.game = game
         self.player = player
         self.verbose = verbose
         self.lossval = lossval
@@ -20,7 +65,102 @@ class Agent(object):
         self.prevstate = None
         self.prevscore = 0
         self.count = 0
-        enumstates(emptystate(), 0, self)  
+        self.canon = canonical_codes() if symmetry else None
+        self.instrument = None
+        if values is not None:
+            self.values = values
+        elif max_states is not None:
+            self.values = BoundedValues(max_states)
+        elif game is not None:
+            self.values = {}
+        else:
+            self.values = self.initial_values(compact)
+
+    def initial_values(self, compact=False):
+        """Return a private copy of the shared initial value table"""
+        symmetric = self.canon is not None
+        key = (self.player, self.lossval, compact, symmetric)
+        if key not in _INITIAL_VALUES:
+            if compact:
+                self.values = ValueTable.initial(self.player, self.winnerval, symmetric)
+            else:
+                self.values = {}
+                enumstates(emptystate(), 0, self)
+            _INITIAL_VALUES[key] = self.values
+        return _INITIAL_VALUES[key].copy()
+
+    def save(self, path):
+        """Write the value function and settings to a binary checkpoint"""
+        if self.game is not None:
+            raise ValueError('checkpoints only support the 3x3 game')
+        symmetric = self.canon is not None
+        index, codes = state_index(self.player, symmetric)
+        if isinstance(self.values, ValueTable):
+            data = array('d', self.values.data)
+            extra = self.values.extra
+        else:
+            data = array('d', [self.peek_code(code) for code in codes])
+            extra = {code: val for code, val in self.values.items() if index[code] < 0}
+        flags = CHECKPOINT_SYMMETRIC if symmetric else 0
+        with open(path, 'wb') as f:
+            f.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, self.player, flags,
+                                           self.alpha, self.lossval, len(data), len(extra)))
+            f.write(data.tobytes())
+            for code, val in extra.items():
+                f.write(struct.pack('<Id', code, val))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Create a compact agent from a checkpoint written by save().
+        With mmap=True the value array is a read-only view of the file, so
+        processes loading the same checkpoint share one physical copy; such
+        agents are returned with learning=False.
+        """
+        with open(path, 'rb') as f:
+            header = f.read(CHECKPOINT_HEADER.size)
+            magic, version, player, flags, alpha, lossval, nslots, nextra = CHECKPOINT_HEADER.unpack(header)
+            if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+                raise ValueError('{0} is not a version {1} agent checkpoint'.format(path, CHECKPOINT_VERSION))
+            symmetric = bool(flags & CHECKPOINT_SYMMETRIC)
+            expected = len(state_index(player, symmetric)[1])
+            if nslots != expected:
+                raise ValueError('{0} has {1} slots, expected {2}'.format(path, nslots, expected))
+            start = CHECKPOINT_HEADER.size
+            end = start + 8 * nslots
+            if mmap:
+                mapped = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+                data = memoryview(mapped)[start:end].cast('d')
+            else:
+                data = array('d')
+                data.frombytes(f.read(end - start))
+            f.seek(end)
+            extra = {}
+            for _ in range(nextra):
+                code, val = struct.unpack('<Id', f.read(12))
+                extra[code] = val
+        agent = cls(player, lossval=lossval, learning=not mmap, alpha=alpha, compact=True,
+                    symmetry=symmetric)
+        agent.values = ValueTable(player, data, extra, symmetric)
+        return agent
+
+    def role_switched(self):
+        """
+        Greedy, non-learning agent for the other seat, as the notebooks'
+        role-switch evaluation builds it, but reading this agent's table
+        through a RoleSwitchedValues view instead of copying any table.
+        This agent's table only holds its own seat's afterstates, which the
+        other seat never looks up, so the switched agent plays on default
+        values (win 1, draw 0, loss lossval, unfinished 0.5): the metric
+        does not depend on training.
+        """
+        if self.game is not None:
+            raise ValueError('role switching is only available for the 3x3 game')
+        other = PLAYER_O if self.player == PLAYER_X else PLAYER_X
+        agent = Agent(other, lossval=self.lossval, learning=False, alpha=self.alpha,
+                      symmetry=self.canon is not None, values=RoleSwitchedValues(self.values))
+        agent.epsilon = 0
+        return agent
 
     def episode_over(self, winner):
         """Update values at end of episode"""
@@ -30,48 +170,88 @@ class Agent(object):
 
     def action(self, state):
         """Choose action using epsilon-greedy policy"""
+        return self.cell(self.action_code(self.statekey(state)))
+
+    def action_state(self, state):
+        """Choose action on a game_logic.GameState, using its empty-cell list"""
+        return self.action_code(state.code, state.empty)
+
+    def action_code(self, code, free=None):
+        """
+        Choose action on an integer state code, returning a cell index.
+        free optionally lists the empty cells so they need not be derived.
+        """
         r = random.random()
         if r < self.epsilon:
-            move = self.random(state)
-            self.log('>>>>>>> Exploratory action: ' + str(move))
+            idx = self.random_code(code, free)
+            if self.verbose:
+                self.log('>>>>>>> Exploratory action: ' + str(divmod(idx, 3)))
+            if self.instrument is not None:
+                self.instrument.count('agent.exploratory')
         else:
-            move = self.greedy(state)
-            self.log('>>>>>>> Best action: ' + str(move))
-        state[move[0]][move[1]] = self.player
-        self.prevstate = self.statetuple(state)
-        self.prevscore = self.lookup(state)
-        state[move[0]][move[1]] = EMPTY
-        return move
+            idx = self.greedy_code(code, free)
+            if self.verbose:
+                self.log('>>>>>>> Best action: ' + str(divmod(idx, 3)))
+            if self.instrument is not None:
+                self.instrument.count('agent.greedy')
+        if self.game is None:
+            after = code + self.player * POW3[idx]
+        else:
+            after = code + self.player * self.game.pow3[idx]
+        if self.canon is not None:
+            after = self.canon[after]
+        self.prevstate = after
+        self.prevscore = self.lookup_code(self.prevstate)
+        return idx
 
     def random(self, state):
         """Choose random available move"""
-        available = []
-        for i in range(3):
-            for j in range(3):
-                if state[i][j] == EMPTY:
-                    available.append((i,j))
-        return random.choice(available)
+        return self.cell(self.random_code(self.statekey(state)))
+
+    def random_code(self, code, free=None):
+        """Choose random available cell index"""
+        if free is not None:
+            return random.choice(free)
+        if self.game is None:
+            return random.choice(EMPTY_CELLS[code])
+        return random.choice(self.game.empty_cells(code))
 
     def greedy(self, state):
         """Choose best move according to learned values"""
-        maxval = -50000
+        return self.cell(self.greedy_code(self.statekey(state)))
+
+    def greedy_code(self, code, free=None):
+        """
+        Choose best cell index according to learned values (lowest index on
+        ties). free may list the empty cells in any order.
+        """
+        maxval = float('-inf')
         maxmove = None
-        if self.verbose:
+        step = self.player
+        if free is not None:
+            free = sorted(free)
+        elif self.game is None:
+            free = EMPTY_CELLS[code]
+        else:
+            free = self.game.empty_cells(code)
+        pow3 = POW3 if self.game is None else self.game.pow3
+        for idx in free:
+            val = self.lookup_code(code + step * pow3[idx])
+            if val > maxval:
+                maxval = val
+                maxmove = idx
+        if self.verbose and self.game is not None:
+            self.game.printboard(code)
+        elif self.verbose:
+            state = decode(code)
             cells = []
-        for i in range(3):
-            for j in range(3):
-                if state[i][j] == EMPTY:
-                    state[i][j] = self.player
-                    val = self.lookup(state)
-                    state[i][j] = EMPTY
-                    if val > maxval:
-                        maxval = val
-                        maxmove = (i, j)
-                    if self.verbose:
-                        cells.append('{0:.3f}'.format(val).center(6))
-                elif self.verbose:
-                    cells.append(['', 'X', 'O'][state[i][j]].center(6))
-        if self.verbose:
+            for idx in range(CELLS):
+                cell = state[idx // 3][idx % 3]
+                if cell == EMPTY:
+                    val = self.lookup_code(code + step * POW3[idx])
+                    cells.append('{0:.3f}'.format(val).center(6))
+                else:
+                    cells.append(['', 'X', 'O'][cell].center(6))
             print("----------------------------\n| {0} | {1} | {2} |\n|--------------------------|\n| {3} | {4} | {5} |\n|--------------------------|\n| {6} | {7} | {8} |\n----------------------------".format(*cells))
         self.backup(maxval)
         return maxmove
@@ -79,20 +259,49 @@ class Agent(object):
     def backup(self, nextval):
         """Q-learning update rule"""
         if self.prevstate != None and self.learning:
-            self.values[self.prevstate] += self.alpha * (nextval - self.prevscore)
+            delta = self.alpha * (nextval - self.prevscore)
+            self.values[self.prevstate] += delta
+            if self.instrument is not None:
+                self.instrument.observe('agent.backup', abs(delta))
 
     def lookup(self, state):
         """Get value for a state"""
-        key = self.statetuple(state)
-        if not key in self.values:
-            self.add(key)
-        return self.values[key]
+        return self.lookup_code(self.statekey(state))
+
+    def lookup_code(self, code):
+        """Get value for an integer state code"""
+        if self.canon is not None:
+            code = self.canon[code]
+        try:
+            return self.values[code]
+        except KeyError:
+            if self.instrument is not None:
+                self.instrument.count('agent.lookup_miss')
+            self.add_code(code)
+            return self.values[code]
+
+    def peek_code(self, code):
+        """Get value for a state code without adding it to the table"""
+        if self.canon is not None:
+            code = self.canon[code]
+        if code in self.values:
+            return self.values[code]
+        if self.game is None:
+            return self.winnerval(WINNERS[code])
+        return self.winnerval(self.game.winner(code))
 
     def add(self, state):
         """Add new state to value function"""
-        winner = gameover(state)
-        tup = self.statetuple(state)
-        self.values[tup] = self.winnerval(winner)
+        self.add_code(self.statekey(state))
+
+    def add_code(self, code):
+        """Add new state code to value function"""
+        if self.canon is not None:
+            code = self.canon[code]
+        if self.game is None:
+            self.values[code] = self.winnerval(WINNERS[code])
+        else:
+            self.values[code] = self.winnerval(self.game.winner(code))
 
     def winnerval(self, winner):
         """Convert game outcome to reward value"""
@@ -105,60 +314,53 @@ class Agent(object):
         else:
             return self.lossval
 
+    def statekey(self, state):
+        """Convert state to its value-table key (integer state code)"""
+        if self.game is None:
+            return encode(state)
+        return self.game.encode(state)
+
     def statetuple(self, state):
-        """Convert state to tuple for hashing"""
-        return (tuple(state[0]),tuple(state[1]),tuple(state[2]))
+        """Convert state to a tuple of row tuples (value-table keys are statekey() codes)"""
+        return tuple(map(tuple, state))
+
+    def cell(self, idx):
+        """Convert a cell index to (row, col)"""
+        if self.game is None:
+            return idx // 3, idx % 3
+        return divmod(idx, self.game.size)
 
     def log(self, s):
         """Print if verbose mode enabled"""
         if self.verbose:
             print(s)
 
-class Human(object):
-    """Human player interface"""
-    
-    def __init__(self, player):
-        self.player = player
-
-    def action(self, state):
-        """Get move from human input"""
-        printboard(state)
-        while True:
-            try:
-                action = input('Your move? i.e. x,y : ')
-                row, col = int(action.split(',')[0]), int(action.split(',')[1])
-                if 0 <= row <= 2 and 0 <= col <= 2:
-                    if state[row][col] == EMPTY:
-                        return (row, col)
-                    else:
-                        print("That position is already occupied! Please choose an empty square.")
-                else:
-                    print("Please enter coordinates between 0-2 (e.g., 1,1)")
-            except (ValueError, IndexError):
-                print("Invalid input! Please enter in format: x,y (e.g., 1,1)")
-
-    def episode_over(self, winner):
-        """Handle end of episode for human"""
-        if winner == DRAW:
-            print('Game over! It was a draw.')
-        else:
-            print('Game over! Winner: Player {0}'.format(winner))
-
 class RandomPlayer(object):
-    """Random move player"""
+    """Random move player (for the 3x3 game, or any game_logic.Game)"""
     
-    def __init__(self, player):
+    def __init__(self, player, game=None):
         self.player = player
+        self.game = None if game is not None and game.classic else game
 
     def action(self, state):
         """Choose random available move"""
         available = []
-        for i in range(3):
-            for j in range(3):
+        for i in range(len(state)):
+            for j in range(len(state[i])):
                 if state[i][j] == EMPTY:
                     available.append((i, j))
         return random.choice(available)
 
+    def action_code(self, code):
+        """Choose random available cell index"""
+        if self.game is None:
+            return random.choice(EMPTY_CELLS[code])
+        return random.choice(self.game.empty_cells(code))
+
+    def action_state(self, state):
+        """Choose random empty cell of a game_logic.GameState"""
+        return random.choice(state.empty)
+
     def episode_over(self, winner):
         """No learning for random player"""
         pass
@@ -174,14 +376,19 @@ class Teacher:
     level : float 
         teacher ability level. This is a value between 0-1 that indicates the
         probability of making the optimal move at any given time.
+    precomputed : bool
+        look optimal moves up in a table shared by all teachers instead of
+        running the rule hierarchy. The table is built for whichever side is
+        to move, so the same teacher plays correctly as X or as O.
     """
 
-    def __init__(self, level=0.9):
+    def __init__(self, level=0.9, precomputed=False):
         """
         Ability level determines the probability that the teacher will follow
         the optimal strategy as opposed to choosing a random available move.
         """
         self.ability_level = level
+        self.moves = teacher_moves() if precomputed else None
 
     def win(self, board, key=PLAYER_X):
         """ If we have two in a row and the 3rd is available, take it. """
@@ -345,6 +552,8 @@ class Teacher:
         is currently available each time. A touple is returned that represents
         (row, col).
         """
+        if self.moves is not None:
+            return divmod(self.action_code(encode(board)), 3)
         # Chose randomly with some probability so that the teacher does not always win
         if random.random() > self.ability_level:
             return self.randomMove(board)
@@ -372,11 +581,63 @@ class Teacher:
             return a
         return self.randomMove(board)
 
+    def optimalMove(self, board):
+        """
+        First move of the strategy hierarchy (playing as X) that lands on an
+        empty square, or None if the board is full.
+        """
+        for rule in (self.win, self.blockWin, self.fork, self.blockFork,
+                     self.center, self.corner, self.sideEmpty):
+            a = rule(board)
+            if a is not None and board[a[0]][a[1]] == EMPTY:
+                return a
+        return None
+
     def action(self, state):
         """Interface method for game system - calls makeMove with numeric board"""
         move = self.makeMove(state)
         return move
 
+    def action_code(self, code):
+        """Interface method for the integer engine - returns a cell index"""
+        if self.moves is None:
+            row, col = self.makeMove(decode(code))
+            return row * 3 + col
+        idx = self.moves[code]
+        if idx < 0:
+            raise ValueError('no teacher move at state {0}: game over or illegal '
+                             'position'.format(code))
+        if random.random() > self.ability_level:
+            possibles = EMPTY_CELLS[code]
+            return possibles[random.randint(0, len(possibles)-1)]
+        return idx
+
+# Optimal teacher move for every state code, from the mover's perspective
+_TEACHER_MOVES = []
+
+def teacher_moves():
+    """
+    Table of Teacher.optimalMove for the side to move in every state code
+    (-1 where the game is over or the position is illegal). O positions are
+    solved with X and O swapped, since the rule hierarchy plays as X.
+    Built on first use and shared by every precomputed Teacher.
+    """
+    if not _TEACHER_MOVES:
+        teacher = Teacher(level=1)
+        swap = (EMPTY, PLAYER_O, PLAYER_X)
+        moves = [-1] * NUM_STATES
+        for code in range(NUM_STATES):
+            mover = LAST_MOVER[code]
+            if mover == -1 or WINNERS[code] != EMPTY:
+                continue
+            board = decode(code)
+            if mover == PLAYER_X:
+                board = [[swap[cell] for cell in row] for row in board]
+            move = teacher.optimalMove(board)
+            moves[code] = move[0] * 3 + move[1]
+        _TEACHER_MOVES[:] = moves
+    return _TEACHER_MOVES
+
 
 class Human:
     """Human player class for interactive play"""
@@ -387,8 +648,6 @@ class Human:
     
     def action(self, state):
         """Get move from human input"""
-        from game_logic import printboard
-        
         print(f"\nPlayer {'X' if self.player == PLAYER_X else 'O'}'s turn:")
         printboard(state)
         
@@ -410,8 +669,6 @@ class Human:
     
     def episode_over(self, winner):
         """Called after game ends - no learning for human"""
-        from game_logic import DRAW
-        
         if winner == self.player:
             print("You won!")
         elif winner == DRAW:
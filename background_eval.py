@@ -0,0 +1,101 @@
+"""
+Background Evaluation for Tic-Tac-Toe RL
+Evaluates snapshots of the agents' value tables in worker processes while
+training continues, streaming [P1-Win, ..., P2-Draw] rows back in order.
+The live agents are never paused or modified.
+"""
+
+import random
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from agents import Agent
+from game_logic import PLAYER_X, PLAYER_O
+from measure_with_random import (value_snapshot, measure_performance_vs_random,
+                                 exact_performance_vs_random)
+from value_table import ValueTable, state_index
+
+# exact_performance_vs_random memo, kept per worker process across checkpoints
+_WORKER_MEMO = {}
+
+def frozen_agent(player, snapshot):
+    """Compact greedy, non-learning Agent whose values are a value_snapshot() array"""
+    agent = Agent(player, learning=False, compact=True)
+    agent.epsilon = 0
+    codes = np.frombuffer(state_index(player)[1], dtype=np.int32)
+    agent.values = ValueTable(player, array('d', snapshot[codes].tobytes()))
+    return agent
+
+def evaluate_snapshot(episode, snapshot1, snapshot2, mode='batch', games=100, seed=None):
+    """
+    Worker entry point: evaluate one checkpoint and return (episode, probs).
+    mode is 'sample', 'batch' or 'exact' as in train.py's eval_mode.
+    """
+    random.seed(seed)
+    agent1 = frozen_agent(PLAYER_X, snapshot1)
+    agent2 = frozen_agent(PLAYER_O, snapshot2)
+    if mode == 'exact':
+        probs = exact_performance_vs_random(agent1, agent2, _WORKER_MEMO)
+    else:
+        probs = measure_performance_vs_random(agent1, agent2, games=games, batch=mode == 'batch')
+    return episode, probs
+
+class BackgroundEvaluator(object):
+    """
+    Hands value snapshots to a process pool and returns results in
+    submission order.
+
+    submit() costs one dense copy of each value table. Results come back
+    through poll() (finished ones, without waiting) and drain() (all
+    outstanding ones). At most max_pending checkpoints are in flight; when
+    that many are queued, submit() waits for the oldest, so a slow evaluator
+    bounds memory instead of falling arbitrarily far behind.
+
+    Every checkpoint is evaluated with its own seed derived from seed and
+    the episode number, so results do not depend on scheduling and the
+    training process's random stream is left untouched.
+    """
+
+    def __init__(self, mode='batch', games=100, max_workers=1, max_pending=64, seed=None):
+        self.mode = mode
+        self.games = games
+        self.max_pending = max_pending
+        self.seed = seed
+        self.pool = ProcessPoolExecutor(max_workers=max_workers)
+        self.pending = deque()
+        self.ready = []
+
+    def submit(self, episode, agent1, agent2):
+        """Snapshot both agents and queue the evaluation of checkpoint `episode`"""
+        if len(self.pending) >= self.max_pending:
+            self.ready.append(self.pending.popleft().result())
+        seed = None if self.seed is None else hash((self.seed, episode))
+        self.pending.append(self.pool.submit(evaluate_snapshot, episode, value_snapshot(agent1),
+                                             value_snapshot(agent2), self.mode, self.games, seed))
+
+    def poll(self):
+        """Return the (episode, probs) results that are finished, oldest first"""
+        while self.pending and self.pending[0].done():
+            self.ready.append(self.pending.popleft().result())
+        ready, self.ready = self.ready, []
+        return ready
+
+    def drain(self):
+        """Wait for every outstanding evaluation and return all unreturned results"""
+        while self.pending:
+            self.ready.append(self.pending.popleft().result())
+        ready, self.ready = self.ready, []
+        return ready
+
+    def close(self):
+        """Shut the pool down, discarding nothing already finished"""
+        self.pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,256 @@
+"""
+Benchmarks for Tic-Tac-Toe RL
+Micro/macro throughput suite for the game and agent hot paths, with JSON
+results and baseline comparison, plus an episodes-to-target comparison of
+plain and symmetry-reduced agents and a worker-scaling run of hogwild
+training.
+
+    python benchmarks.py suite --out bench.json [--baseline old.json]
+    python benchmarks.py symmetry --seeds 5
+    python benchmarks.py hogwild --episodes 200000
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+
+from agents import Agent, Teacher, RandomPlayer
+from game_logic import play, play_code, gameover, gameover_code, enumstates, emptystate, encode, PLAYER_X, PLAYER_O
+from measure_with_random import measure_performance_vs_random, exact_performance_vs_random
+from train import run_training
+from solver import PerfectPlayer, optimality_gap
+from policy import FrozenPolicy
+from hogwild import train_hogwild
+
+# Mid-game position used by the micro benchmarks: X to move
+MID_BOARD = [[1, 0, 2], [0, 1, 0], [0, 0, 2]]
+
+def time_call(fn, repeat=3):
+    """Best-of-repeat (calls per second, microseconds per call) for fn()"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return number / best, best / number * 1e6
+
+def _trained_pair(episodes=2000):
+    """Agent pair with a realistically filled value table"""
+    random.seed(0)
+    p1 = Agent(PLAYER_X)
+    p2 = Agent(PLAYER_O)
+    teacher = Teacher()
+    for i in range(episodes):
+        if i % 2 == 0:
+            p1.episode_over(play(p1, teacher))
+        else:
+            p2.episode_over(play(teacher, p2))
+    return p1, p2
+
+def micro_benchmarks():
+    """Name -> zero-argument callable for every per-call benchmark"""
+    p1, p2 = _trained_pair()
+    frozen1, frozen2 = _trained_pair()
+    for agent in (frozen1, frozen2):
+        agent.learning = False
+    greedy = _trained_pair()[0]
+    greedy.epsilon = 0
+    greedy.learning = False
+    teacher = Teacher()
+    table_teacher = Teacher(precomputed=True)
+    rand_x = RandomPlayer(PLAYER_X)
+    rand_o = RandomPlayer(PLAYER_O)
+    mid_code = encode(MID_BOARD)
+    scratch = Agent(PLAYER_X)
+    perfect = PerfectPlayer(PLAYER_X)
+    policy = FrozenPolicy.from_agent(greedy)
+    batch_codes = np.full(1000, mid_code, dtype=np.int64)
+    batch_moves = np.empty(1000, dtype=np.int8)
+
+    def enumerate_states():
+        scratch.values = {}
+        enumstates(emptystate(), 0, scratch)
+
+    return {
+        'gameover': lambda: gameover(MID_BOARD),
+        'gameover_code': lambda: gameover_code(mid_code),
+        'enumstates': enumerate_states,
+        'agent_construction': lambda: Agent(PLAYER_X),
+        'agent_construction_compact': lambda: Agent(PLAYER_X, compact=True),
+        'agent_action': lambda: greedy.action(MID_BOARD),
+        'agent_action_code': lambda: greedy.action_code(mid_code),
+        'policy_freeze': lambda: FrozenPolicy.from_agent(greedy),
+        'policy_action_code': lambda: policy.action_code(mid_code),
+        'policy_moves_batch_1000': lambda: policy.moves(batch_codes, out=batch_moves),
+        'teacher_makemove': lambda: teacher.makeMove(MID_BOARD),
+        'teacher_makemove_precomputed': lambda: table_teacher.makeMove(MID_BOARD),
+        'play_agent_vs_teacher': lambda: p1.episode_over(play(p1, teacher)),
+        'play_teacher_vs_agent': lambda: p2.episode_over(play(teacher, p2)),
+        'play_agent_vs_random': lambda: play(frozen1, rand_o),
+        'play_random_vs_agent': lambda: play(rand_x, frozen2),
+        'play_agent_vs_agent': lambda: play(frozen1, frozen2),
+        'play_random_vs_random': lambda: play_code(rand_x, rand_o),
+        'measure_vs_random_100': lambda: measure_performance_vs_random(frozen1, frozen2, games=100),
+        'measure_vs_random_batch_100': lambda: measure_performance_vs_random(frozen1, frozen2, games=100, batch=True),
+        'measure_vs_random_batch_10000': lambda: measure_performance_vs_random(frozen1, frozen2, games=10000, batch=True),
+        'exact_vs_random': lambda: exact_performance_vs_random(frozen1, frozen2),
+        'optimality_gap': lambda: optimality_gap(frozen1),
+        'play_perfect_vs_agent': lambda: play(perfect, frozen2),
+    }
+
+def training_benchmark(episodes=10000, **kwargs):
+    """End-to-end episodes/sec of a train.py run with evaluation every 10 episodes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        run_training(tmp, episodes=episodes, seed=0, verbose=False, **kwargs)
+        elapsed = time.perf_counter() - start
+    return episodes / elapsed, elapsed / episodes * 1e6
+
+def run_suite(training_episodes=10000, names=None):
+    """Run every benchmark and return the JSON-ready result document"""
+    results = {}
+    for name, fn in micro_benchmarks().items():
+        if names and name not in names:
+            continue
+        random.seed(0)
+        ops, latency = time_call(fn)
+        results[name] = {'ops_per_sec': ops, 'latency_us': latency}
+    for name, kwargs in (('train_sample_eval', {}),
+                         ('train_batch_eval', {'eval_mode': 'batch'}),
+                         ('train_exact_eval', {'eval_mode': 'exact'})):
+        if names and name not in names:
+            continue
+        ops, latency = training_benchmark(training_episodes, **kwargs)
+        results[name] = {'ops_per_sec': ops, 'latency_us': latency, 'episodes': training_episodes}
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+
+def compare(current, baseline, tolerance=0.15):
+    """
+    Print ops/sec against a baseline document and return the names that got
+    slower by more than tolerance (as a fraction).
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            print('{0:34s} {1:14.1f} ops/s   (new)'.format(name, result['ops_per_sec']))
+            continue
+        ratio = result['ops_per_sec'] / old['ops_per_sec']
+        flag = ''
+        if ratio < 1 - tolerance:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print('{0:34s} {1:14.1f} ops/s   x{2:.2f} vs baseline{3}'.format(
+            name, result['ops_per_sec'], ratio, flag))
+    return regressions
+
+def report(current):
+    """Print ops/sec and latency for every benchmark"""
+    for name, result in current['results'].items():
+        print('{0:34s} {1:14.1f} ops/s {2:12.2f} us/op'.format(
+            name, result['ops_per_sec'], result['latency_us']))
+
+def episodes_to_target(symmetry, alpha=0.1, target_x=0.95, target_o=0.8, max_episodes=20000,
+                       seed=None, check_every=10):
+    """
+    Train an X/O agent pair on the notebooks' teacher schedule and return
+    (episodes until P1-Win >= target_x, episodes until P2-Win >= target_o,
+    final table sizes, seconds). Win rates are exact, so no sampling noise
+    decides when a target is hit. None means the target was not reached.
+    """
+    random.seed(seed)
+    p1 = Agent(PLAYER_X, alpha=alpha, symmetry=symmetry)
+    p2 = Agent(PLAYER_O, alpha=alpha, symmetry=symmetry)
+    teacher_o = Teacher(level=0.9)
+    teacher_x = Teacher(level=0.9)
+    memo = {}
+    reached_x = reached_o = None
+    start = time.perf_counter()
+    for i in range(1, max_episodes + 1):
+        if i % 2 == 1:
+            p1.episode_over(play(p1, teacher_o))
+        else:
+            p2.episode_over(play(teacher_x, p2))
+        if i % check_every == 0:
+            probs = exact_performance_vs_random(p1, p2, memo)
+            if reached_x is None and probs[0] >= target_x:
+                reached_x = i
+            if reached_o is None and probs[3] >= target_o:
+                reached_o = i
+            if reached_x is not None and reached_o is not None:
+                break
+    return reached_x, reached_o, (len(p1.values), len(p2.values)), time.perf_counter() - start
+
+def symmetry_benchmark(seeds=5, **kwargs):
+    """Print episodes-to-target for plain and symmetry-reduced agents"""
+    for symmetry in (False, True):
+        rows = [episodes_to_target(symmetry, seed=seed, **kwargs) for seed in range(seeds)]
+        print('symmetry={0}'.format(symmetry))
+        for seed, (ex, eo, sizes, secs) in enumerate(rows):
+            print('  seed {0}: X target at {1}, O target at {2}, table sizes {3}, {4:.2f}s'.format(
+                seed, ex, eo, sizes, secs))
+
+def hogwild_benchmark(episodes=200000, max_workers=None, seed=0, **kwargs):
+    """Print episodes/sec and final exact win rates for 1..max_workers hogwild workers"""
+    for workers in range(1, (max_workers or os.cpu_count()) + 1):
+        start = time.perf_counter()
+        _, _, history = train_hogwild(workers, episodes, seed=seed, consolidate_every=episodes,
+                                      **kwargs)
+        elapsed = time.perf_counter() - start
+        probs = history[-1]['probs']
+        print('workers={0}: {1:10.1f} episodes/s, P1-Win={2:.3f} P2-Win={3:.3f}'.format(
+            workers, episodes / elapsed, probs[0], probs[3]))
+
+def main():
+    parser = argparse.ArgumentParser(description='Tic-Tac-Toe RL benchmarks.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    suite = commands.add_parser('suite', help='throughput of game and agent hot paths')
+    suite.add_argument('--out', default=None, help='write results as JSON')
+    suite.add_argument('--baseline', default=None, help='JSON results to compare against')
+    suite.add_argument('--tolerance', type=float, default=0.15,
+                       help='slowdown fraction reported as a regression')
+    suite.add_argument('--episodes', type=int, default=10000, help='episodes for training benchmarks')
+    suite.add_argument('--only', nargs='+', default=None, help='run only these benchmarks')
+
+    symmetry = commands.add_parser('symmetry', help='episodes to target win rate with/without symmetry')
+    symmetry.add_argument('--seeds', type=int, default=5)
+    symmetry.add_argument('--alpha', type=float, default=0.1)
+    symmetry.add_argument('--target-x', type=float, default=0.95)
+    symmetry.add_argument('--target-o', type=float, default=0.8)
+    symmetry.add_argument('--max-episodes', type=int, default=20000)
+    hogwild = commands.add_parser('hogwild', help='episodes/sec and win rate vs hogwild worker count')
+    hogwild.add_argument('--episodes', type=int, default=200000)
+    hogwild.add_argument('--max-workers', type=int, default=None, help='default: number of cores')
+    hogwild.add_argument('--mode', choices=['teacher', 'self'], default='teacher')
+    hogwild.add_argument('--alpha', type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.command == 'hogwild':
+        hogwild_benchmark(args.episodes, args.max_workers, mode=args.mode, alpha=args.alpha)
+        return
+    if args.command == 'symmetry':
+        symmetry_benchmark(args.seeds, alpha=args.alpha, target_x=args.target_x,
+                           target_o=args.target_o, max_episodes=args.max_episodes)
+        return
+    current = run_suite(args.episodes, args.only)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(current, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.tolerance):
+            sys.exit(1)
+    else:
+        report(current)
+
+if __name__ == '__main__':
+    main()
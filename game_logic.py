@@ -3,6 +3,8 @@ Tic-Tac-Toe Game Logic
 Contains basic game rules, board operations, and utility functions.
 """
 
+import time
+
 # Game constants
 EMPTY = 0
 PLAYER_X = 1
@@ -12,6 +14,16 @@ DRAW = 3
 BOARD_FORMAT = "----------------------------\n| {0} | {1} | {2} |\n|--------------------------|\n| {3} | {4} | {5} |\n|--------------------------|\n| {6} | {7} | {8} |\n----------------------------"
 NAMES = [' ', 'X', 'O']
 
+# Integer board representation: cell (i, j) is index i*3 + j and a board is
+# the base-3 number sum(cell * 3**index), so every position fits in one int.
+CELLS = 9
+POW3 = tuple(3 ** idx for idx in range(CELLS))
+NUM_STATES = 3 ** CELLS
+LINES = ((0, 1, 2), (3, 4, 5), (6, 7, 8),
+         (0, 3, 6), (1, 4, 7), (2, 5, 8),
+         (0, 4, 8), (2, 4, 6))
+LINE_MASKS = tuple(sum(1 << idx for idx in line) for line in LINES)
+
 def printboard(state):
     """Display the current board state"""
     cells = []
@@ -78,16 +90,385 @@ def enumstates(state, idx, agent):
             state[i][j] = val
             enumstates(state, idx+1, agent)
 
-def play(agent1, agent2):
-    """Play a single game between two agents"""
+def encode(state):
+    """Convert a 3x3 board to its integer state code"""
+    code = 0
+    for idx in range(CELLS - 1, -1, -1):
+        code = code * 3 + state[idx // 3][idx % 3]
+    return code
+
+def decode(code):
+    """Convert an integer state code back to a 3x3 board"""
     state = emptystate()
+    for idx in range(CELLS):
+        code, state[idx // 3][idx % 3] = divmod(code, 3)
+    return state
+
+def masks(code):
+    """Split a state code into 9-bit occupancy masks for X and O"""
+    xmask = 0
+    omask = 0
+    for idx in range(CELLS):
+        code, val = divmod(code, 3)
+        if val == PLAYER_X:
+            xmask |= 1 << idx
+        elif val == PLAYER_O:
+            omask |= 1 << idx
+    return xmask, omask
+
+def _build_tables():
+    """Precompute winner, mover and empty-cell tables for every state code"""
+    winners = bytearray(NUM_STATES)
+    movers = [-1] * NUM_STATES
+    empties = [()] * NUM_STATES
+    for code in range(NUM_STATES):
+        xmask, omask = masks(code)
+        winner = EMPTY
+        for line in LINE_MASKS:
+            if xmask & line == line:
+                winner = PLAYER_X
+                break
+            if omask & line == line:
+                winner = PLAYER_O
+                break
+        free = tuple(idx for idx in range(CELLS) if not (xmask | omask) >> idx & 1)
+        if winner == EMPTY and not free:
+            winner = DRAW
+        winners[code] = winner
+        empties[code] = free
+        countx = bin(xmask).count('1')
+        counto = bin(omask).count('1')
+        if countx == counto:
+            movers[code] = PLAYER_O
+        elif countx == counto + 1:
+            movers[code] = PLAYER_X
+    return winners, movers, empties
+
+# WINNERS[code] is what gameover() returns, LAST_MOVER[code] what
+# last_to_act() returns and EMPTY_CELLS[code] the free cell indices in order.
+WINNERS, LAST_MOVER, EMPTY_CELLS = _build_tables()
+
+def _symmetries():
+    """The 8 rotations/reflections as cell permutations (new idx takes old perm[idx])"""
+    rotate = tuple((2 - idx % 3) * 3 + idx // 3 for idx in range(CELLS))
+    flip = tuple(idx // 3 * 3 + 2 - idx % 3 for idx in range(CELLS))
+    perms = {tuple(range(CELLS))}
+    frontier = list(perms)
+    while frontier:
+        perm = frontier.pop()
+        for step in (rotate, flip):
+            new = tuple(perm[step[idx]] for idx in range(CELLS))
+            if new not in perms:
+                perms.add(new)
+                frontier.append(new)
+    return sorted(perms)
+
+SYMMETRIES = _symmetries()
+
+_CANONICAL = []
+
+def canonical_codes():
+    """
+    Table mapping every state code to the smallest code among its 8
+    symmetric variants. Built on first use and shared by the process.
+    """
+    if not _CANONICAL:
+        # A code splits into three 3-cell chunks; precompute what each chunk
+        # contributes to the transformed code so each variant is 3 lookups.
+        chunk_tables = []
+        for perm in SYMMETRIES:
+            target = [0] * CELLS
+            for new, old in enumerate(perm):
+                target[old] = new
+            tables = []
+            for chunk in range(3):
+                table = []
+                for part in range(27):
+                    val = 0
+                    for offset in range(3):
+                        part, digit = divmod(part, 3)
+                        val += digit * POW3[target[chunk * 3 + offset]]
+                    table.append(val)
+                tables.append(table)
+            chunk_tables.append(tables)
+        canon = []
+        for code in range(NUM_STATES):
+            low, mid, high = code % 27, code // 27 % 27, code // 729
+            canon.append(min(a[low] + b[mid] + c[high] for a, b, c in chunk_tables))
+        _CANONICAL[:] = canon
+    return _CANONICAL
+
+def variants(code):
+    """Set of the state codes symmetric to code (including code itself)"""
+    digits = [code // POW3[idx] % 3 for idx in range(CELLS)]
+    return {sum(digits[perm[idx]] * POW3[idx] for idx in range(CELLS)) for perm in SYMMETRIES}
+
+def gameover_code(code):
+    """Table-driven gameover() for an integer state code"""
+    return WINNERS[code]
+
+def last_to_act_code(code):
+    """Table-driven last_to_act() for an integer state code"""
+    return LAST_MOVER[code]
+
+class Game(object):
+    """
+    Rules for an N x N board where k in a row wins, on base-3 state codes
+    (cell idx = row * size + col, as for the classic board).
+
+    The classic 3x3 game is served by the module-level tables; Game(3, 3)
+    reports classic=True so callers can keep using them. Larger boards work
+    without any per-state tables. During play, GameState.apply detects wins
+    incrementally from per-line piece counts; Game.winner is a full scan of
+    every line, used for arbitrary codes such as value-table misses.
+    """
+
+    def __init__(self, size=3, k=3):
+        if not 1 <= k <= size:
+            raise ValueError('need 1 <= k <= size, got size={0}, k={1}'.format(size, k))
+        self.size = size
+        self.k = k
+        self.cells = size * size
+        self.classic = size == 3 and k == 3
+        self.pow3 = tuple(3 ** idx for idx in range(self.cells))
+        lines = []
+        for row in range(size):
+            for col in range(size):
+                for drow, dcol in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_row = row + drow * (k - 1)
+                    end_col = col + dcol * (k - 1)
+                    if end_row < size and 0 <= end_col < size:
+                        lines.append(tuple((row + drow * step) * size + col + dcol * step
+                                           for step in range(k)))
+        self.lines = tuple(lines)
+        self.line_ids = tuple(tuple(n for n, line in enumerate(self.lines) if idx in line)
+                              for idx in range(self.cells))
+
+    def __repr__(self):
+        return 'Game(size={0}, k={1})'.format(self.size, self.k)
+
+    def cell(self, code, idx):
+        """Contents of cell idx"""
+        return code // self.pow3[idx] % 3
+
+    def empty_cells(self, code):
+        """Free cell indices in order"""
+        pow3 = self.pow3
+        return tuple(idx for idx in range(self.cells) if code // pow3[idx] % 3 == EMPTY)
+
+    def winner(self, code):
+        """gameover() for any state code, scanning every line"""
+        pow3 = self.pow3
+        for line in self.lines:
+            piece = code // pow3[line[0]] % 3
+            if piece != EMPTY and all(code // pow3[other] % 3 == piece for other in line):
+                return piece
+        if all(code // pow3[idx] % 3 != EMPTY for idx in range(self.cells)):
+            return DRAW
+        return EMPTY
+
+    def encode(self, state):
+        """Convert a size x size board to its state code"""
+        code = 0
+        for idx in range(self.cells - 1, -1, -1):
+            code = code * 3 + state[idx // self.size][idx % self.size]
+        return code
+
+    def decode(self, code):
+        """Convert a state code to a size x size board"""
+        state = [[EMPTY] * self.size for _ in range(self.size)]
+        for idx in range(self.cells):
+            code, state[idx // self.size][idx % self.size] = divmod(code, 3)
+        return state
+
+    def printboard(self, code):
+        """Display the board for a state code"""
+        for row in self.decode(code):
+            print('|' + '|'.join(NAMES[cell].center(3) for cell in row) + '|')
+
+CLASSIC = Game(3, 3)
+
+class GameState(object):
+    """
+    A game in progress: state code, board, per-line piece counts and the
+    list of empty cells, all updated in O(lines through the cell) by
+    apply(). Agents read code, board or empty directly; nothing is copied
+    or rescanned per move. empty is kept by swap-removal, so its order is
+    not the cell order.
+    """
+
+    __slots__ = ('game', 'code', 'board', 'moves', 'counts', 'empty', 'slot', 'winner')
+
+    def __init__(self, game=None):
+        game = CLASSIC if game is None else game
+        self.game = game
+        self.code = 0
+        self.board = [[EMPTY] * game.size for _ in range(game.size)]
+        self.moves = 0
+        # counts[piece][line id] = pieces of that player on the line
+        self.counts = (None, [0] * len(game.lines), [0] * len(game.lines))
+        self.empty = list(range(game.cells))
+        self.slot = list(range(game.cells))
+        self.winner = EMPTY
+
+    def apply(self, idx):
+        """
+        Place the next player's piece on cell idx and return the winner so
+        far (EMPTY while the game goes on). A taken cell is overwritten, as
+        play() has always done.
+        """
+        game = self.game
+        piece = self.moves % 2 + 1
+        row = self.board[idx // game.size]
+        col = idx % game.size
+        old = row[col]
+        row[col] = piece
+        self.code += (piece - old) * game.pow3[idx]
+        self.moves += 1
+        lines = game.line_ids[idx]
+        if old == EMPTY:
+            empty = self.empty
+            last = empty.pop()
+            if last != idx:
+                pos = self.slot[idx]
+                empty[pos] = last
+                self.slot[last] = pos
+        else:
+            counts = self.counts[old]
+            for line in lines:
+                counts[line] -= 1
+        counts = self.counts[piece]
+        k = game.k
+        for line in lines:
+            counts[line] += 1
+            if counts[line] == k:
+                self.winner = piece
+        if self.winner == EMPTY and not self.empty:
+            self.winner = DRAW
+        return self.winner
+
+def _chooser(agent):
+    """Callable mapping a GameState to the agent's cell index"""
+    if hasattr(agent, 'action_state'):
+        return agent.action_state
+    return lambda state: agent.action_code(state.code)
+
+def play_game(agent1, agent2, game):
+    """
+    Play a single game of `game` on a GameState. Agents provide
+    action_state(state) or action_code(code), returning a cell index.
+    """
+    state = GameState(game)
+    choose = (_chooser(agent1), _chooser(agent2))
+    for i in range(game.cells):
+        winner = state.apply(choose[i % 2](state))
+        if winner != EMPTY:
+            return winner
+    return winner
+
+def play_code(agent1, agent2):
+    """Play a single game on integer state codes.
+
+    Both agents must provide action_code(code), returning a cell index 0-8.
+    """
+    code = 0
+    winners = WINNERS
     for i in range(9):
         if i % 2 == 0:
-            move = agent1.action(state)
+            idx = agent1.action_code(code)
         else:
-            move = agent2.action(state)
-        state[move[0]][move[1]] = (i % 2) + 1
-        winner = gameover(state)
+            idx = agent2.action_code(code)
+        # Overwrite the cell like play() does, even if it is already taken
+        place = POW3[idx]
+        code += ((i % 2) + 1 - code // place % 3) * place
+        winner = winners[code]
+        if winner != EMPTY:
+            return winner
+    return winner
+
+def play_instrumented(agent1, agent2, instrument):
+    """play() that reports games, moves, outcomes and per-phase time to instrument"""
+    clock = time.perf_counter
+    start = clock()
+    spent = [0.0, 0.0]
+    use_code = hasattr(agent1, 'action_code') and hasattr(agent2, 'action_code')
+    code = 0
+    state = None if use_code else GameState()
+    agents = (agent1, agent2)
+    for i in range(9):
+        side = i % 2
+        before = clock()
+        if use_code:
+            idx = agents[side].action_code(code)
+        else:
+            move = agents[side].action(state.board)
+        spent[side] += clock() - before
+        if use_code:
+            place = POW3[idx]
+            code += (side + 1 - code // place % 3) * place
+            winner = WINNERS[code]
+        else:
+            winner = state.apply(move[0] * 3 + move[1])
+        if winner != EMPTY:
+            break
+    total = clock() - start
+    instrument.count('play.games')
+    instrument.count('play.moves', i + 1)
+    instrument.count('play.winner.{0}'.format(winner))
+    instrument.add_time('play.agent1', spent[0], (i + 2) // 2)
+    instrument.add_time('play.agent2', spent[1], (i + 1) // 2)
+    instrument.add_time('play.rules', total - spent[0] - spent[1], i + 1)
+    instrument.add_time('play.game', total)
+    return winner
+
+def play_recorded(agent1, agent2, recorder):
+    """
+    play() that passes the cell indices played and the winner to
+    recorder.record(moves, winner), e.g. a gamelog.GameLogWriter.
+    """
+    use_code = hasattr(agent1, 'action_code') and hasattr(agent2, 'action_code')
+    code = 0
+    state = None if use_code else GameState()
+    agents = (agent1, agent2)
+    moves = []
+    for i in range(9):
+        side = i % 2
+        if use_code:
+            idx = agents[side].action_code(code)
+            place = POW3[idx]
+            code += (side + 1 - code // place % 3) * place
+            winner = WINNERS[code]
+        else:
+            move = agents[side].action(state.board)
+            idx = move[0] * 3 + move[1]
+            winner = state.apply(idx)
+        moves.append(idx)
+        if winner != EMPTY:
+            break
+    recorder.record(moves, winner)
+    return winner
+
+def play(agent1, agent2, instrument=None, game=None, recorder=None):
+    """
+    Play a single game between two agents (of `game`, if not 3x3). A
+    recorder receives every 3x3 game's moves; recorded games are not
+    instrumented.
+    """
+    if game is not None and not game.classic:
+        return play_game(agent1, agent2, game)
+    if recorder is not None:
+        return play_recorded(agent1, agent2, recorder)
+    if instrument is not None:
+        return play_instrumented(agent1, agent2, instrument)
+    if hasattr(agent1, 'action_code') and hasattr(agent2, 'action_code'):
+        return play_code(agent1, agent2)
+    state = GameState()
+    for i in range(9):
+        if i % 2 == 0:
+            move = agent1.action(state.board)
+        else:
+            move = agent2.action(state.board)
+        winner = state.apply(move[0] * 3 + move[1])
         if winner != EMPTY:
             return winner
     return winner
\ No newline at end of file
@@ -0,0 +1,180 @@
+"""
+Game Logs for Tic-Tac-Toe RL
+Append-only binary recording of played games, a streaming reader, and an
+offline trainer that replays logged games through Agent's backup rule.
+
+Each game takes 1 + ceil(moves / 2) bytes: a byte holding the number of
+moves (high nibble) and the winner (low nibble), then the cell indices
+packed two per byte, first move in the high nibble.
+
+    python gamelog.py record teacher.log --games 100000
+    python gamelog.py train teacher.log --alphas 0.01 0.1 0.5 0.99
+"""
+
+import argparse
+import os
+import random
+
+from agents import Agent, Teacher
+from game_logic import PLAYER_X, PLAYER_O, POW3, EMPTY_CELLS, play
+from measure_with_random import exact_performance_vs_random
+
+GAMELOG_MAGIC = b'TTTG\x01'
+
+class GameLogWriter(object):
+    """
+    Appends games to a log file; pass it to play() as recorder. Games are
+    buffered and written in blocks, so call close() (or use `with`) to make
+    sure the last ones reach the file.
+    """
+
+    def __init__(self, path, buffer_games=4096):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'ab')
+        if new:
+            self.file.write(GAMELOG_MAGIC)
+        self.buffer = bytearray()
+        self.buffered = 0
+        self.buffer_games = buffer_games
+        self.games = 0
+
+    def record(self, moves, winner):
+        """Append one game: its cell indices in order and the winner"""
+        buffer = self.buffer
+        buffer.append(len(moves) << 4 | winner)
+        for i in range(0, len(moves) - 1, 2):
+            buffer.append(moves[i] << 4 | moves[i + 1])
+        if len(moves) % 2:
+            buffer.append(moves[-1] << 4)
+        self.games += 1
+        self.buffered += 1
+        if self.buffered >= self.buffer_games:
+            self.flush()
+
+    def flush(self):
+        """Write buffered games to the file"""
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.buffer = bytearray()
+        self.buffered = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_games(path, chunk_size=1 << 20):
+    """
+    Yield (moves, winner) for every game in a log, reading chunk_size bytes
+    at a time so memory use does not grow with the log.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(GAMELOG_MAGIC)) != GAMELOG_MAGIC:
+            raise ValueError('{0} is not a game log'.format(path))
+        data = b''
+        pos = 0
+        while True:
+            chunk = f.read(chunk_size)
+            data = data[pos:] + chunk
+            pos = 0
+            end = len(data) if not chunk else len(data) - 5
+            while pos < end:
+                header = data[pos]
+                count = header >> 4
+                stop = pos + 1 + (count + 1) // 2
+                if stop > len(data):
+                    break
+                moves = []
+                for byte in data[pos + 1:stop]:
+                    moves.append(byte >> 4)
+                    moves.append(byte & 15)
+                del moves[count:]
+                yield moves, header & 15
+                pos = stop
+            if not chunk:
+                if pos < len(data):
+                    raise ValueError('{0} ends with a truncated game'.format(path))
+                return
+
+def replay_game(agent, moves, winner):
+    """
+    Replay one logged game into agent. At each of the agent's moves the
+    previous afterstate is backed up towards the best value available (as
+    a greedy Agent move does), then the logged move is taken whoever chose
+    it; the episode ends with the usual episode_over backup.
+    """
+    player = agent.player
+    code = 0
+    for i, idx in enumerate(moves):
+        piece = (i % 2) + 1
+        if piece == player:
+            maxval = float('-inf')
+            for cell in EMPTY_CELLS[code]:
+                val = agent.lookup_code(code + player * POW3[cell])
+                if val > maxval:
+                    maxval = val
+            agent.backup(maxval)
+        place = POW3[idx]
+        code += (piece - code // place % 3) * place
+        if piece == player:
+            agent.prevstate = code if agent.canon is None else agent.canon[code]
+            agent.prevscore = agent.lookup_code(code)
+    agent.episode_over(winner)
+
+def train_offline(path, agents, games=None):
+    """
+    Stream the games of a log (the first `games`, if given) through every
+    agent in `agents`, so one log trains many settings in a single pass.
+    Returns the number of games replayed.
+    """
+    n = 0
+    for moves, winner in read_games(path):
+        if games is not None and n >= games:
+            break
+        for agent in agents:
+            replay_game(agent, moves, winner)
+        n += 1
+    return n
+
+def main():
+    parser = argparse.ArgumentParser(description='Record and replay Tic-Tac-Toe game logs.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help='append teacher-vs-teacher games to a log')
+    record.add_argument('path')
+    record.add_argument('--games', type=int, default=100000)
+    record.add_argument('--teacher-level', type=float, default=0.9)
+    record.add_argument('--seed', type=int, default=None)
+
+    train = commands.add_parser('train', help='train agents offline from a log')
+    train.add_argument('path')
+    train.add_argument('--alphas', type=float, nargs='+', default=[0.01, 0.1, 0.5, 0.99])
+    train.add_argument('--lossval', type=float, default=-1)
+    train.add_argument('--games', type=int, default=None, help='replay only the first N games')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        random.seed(args.seed)
+        teacher_x = Teacher(level=args.teacher_level, precomputed=True)
+        teacher_o = Teacher(level=args.teacher_level, precomputed=True)
+        with GameLogWriter(args.path) as log:
+            for _ in range(args.games):
+                play(teacher_x, teacher_o, recorder=log)
+        print('Recorded {0} games to {1}'.format(args.games, args.path))
+        return
+
+    pairs = [(Agent(PLAYER_X, lossval=args.lossval, alpha=alpha),
+              Agent(PLAYER_O, lossval=args.lossval, alpha=alpha)) for alpha in args.alphas]
+    n = train_offline(args.path, [agent for pair in pairs for agent in pair], args.games)
+    print('Replayed {0} games'.format(n))
+    for alpha, (p1, p2) in zip(args.alphas, pairs):
+        probs = exact_performance_vs_random(p1, p2)
+        print('alpha={0}: P1-Win={1:.3f} P2-Win={2:.3f}'.format(alpha, probs[0], probs[3]))
+
+if __name__ == '__main__':
+    main()
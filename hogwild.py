@@ -0,0 +1,185 @@
+"""
+Hogwild Training for Tic-Tac-Toe RL
+Worker processes train one X and one O value table held in shared memory,
+applying Agent backups directly to it without locks, while the parent
+periodically consolidates a snapshot into private agents, evaluates it and
+optionally checkpoints it.
+
+    python hogwild.py --workers 4 --episodes 1000000 --out hogwild_run
+"""
+
+import argparse
+import os
+import random
+import time
+from array import array
+from multiprocessing import Process, shared_memory
+
+from agents import Agent, Teacher
+from game_logic import play, PLAYER_X, PLAYER_O
+from measure_with_random import exact_performance_vs_random
+from value_table import ValueTable, state_index
+
+class SharedValues(object):
+    """
+    Layout of the shared block: the X table's slots, the O table's slots,
+    then one int64 episode counter per worker. Each worker only writes its
+    own counter, so progress needs no locking either.
+    """
+
+    def __init__(self, workers, symmetric=False, name=None):
+        self.workers = workers
+        self.symmetric = symmetric
+        self.sizes = [len(state_index(player, symmetric)[1]) for player in (PLAYER_X, PLAYER_O)]
+        nbytes = 8 * (sum(self.sizes) + workers)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        words = self.shm.buf[:nbytes]
+        self.views = [words]
+        nx, no = self.sizes
+        self.data = {PLAYER_X: words[:8 * nx].cast('d'),
+                     PLAYER_O: words[8 * nx:8 * (nx + no)].cast('d')}
+        self.counters = words[8 * (nx + no):].cast('q')
+        self.views.extend([self.data[PLAYER_X], self.data[PLAYER_O], self.counters])
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def table(self, player):
+        """ValueTable for player backed directly by the shared slots"""
+        return ValueTable(player, self.data[player], symmetric=self.symmetric)
+
+    def episodes(self):
+        """Episodes finished by all workers so far"""
+        return sum(self.counters)
+
+    def close(self, unlink=False):
+        """Release this process's views (and the block itself if unlink)"""
+        for view in reversed(self.views):
+            view.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+def _worker(name, workers, worker, episodes, mode, alpha, lossval, teacher_level, symmetric, seed):
+    """Train against the shared tables until this worker's share of episodes is done"""
+    random.seed(seed)
+    shared = SharedValues(workers, symmetric, name)
+    p1 = Agent(PLAYER_X, lossval=lossval, alpha=alpha, compact=True, symmetry=symmetric)
+    p2 = Agent(PLAYER_O, lossval=lossval, alpha=alpha, compact=True, symmetry=symmetric)
+    p1.values = shared.table(PLAYER_X)
+    p2.values = shared.table(PLAYER_O)
+    teacher_o = Teacher(level=teacher_level, precomputed=True)
+    teacher_x = Teacher(level=teacher_level, precomputed=True)
+    counters = shared.counters
+    for i in range(episodes):
+        if mode == 'self':
+            winner = play(p1, p2)
+            p1.episode_over(winner)
+            p2.episode_over(winner)
+        elif i % 2 == 0:
+            p1.episode_over(play(p1, teacher_o))
+        else:
+            p2.episode_over(play(teacher_x, p2))
+        if i % 64 == 63:
+            counters[worker] = i + 1
+    counters[worker] = episodes
+    p1.values = p2.values = None
+    shared.close()
+
+def consolidate(shared, alpha=0.99, lossval=-1):
+    """Private (agent1, agent2) holding a snapshot of the shared tables"""
+    symmetric = shared.symmetric
+    pair = []
+    for player in (PLAYER_X, PLAYER_O):
+        agent = Agent(player, lossval=lossval, alpha=alpha, compact=True, symmetry=symmetric)
+        agent.values = ValueTable(player, array('d', shared.data[player]), symmetric=symmetric)
+        pair.append(agent)
+    return tuple(pair)
+
+def train_hogwild(workers=2, episodes=100000, mode='teacher', alpha=0.1, lossval=-1,
+                  teacher_level=0.9, symmetry=False, seed=None, consolidate_every=10000,
+                  out_dir=None, poll=0.05, verbose=False):
+    """
+    Train with `workers` processes sharing one X and one O table. mode is
+    'teacher' (the notebooks' alternating agent-vs-teacher schedule in every
+    worker) or 'self' (the X and O agents play each other). Every
+    consolidate_every episodes, and at the end, the shared tables are
+    snapshot into private agents, evaluated exactly vs random players and,
+    with out_dir, checkpointed there.
+    Returns (agent1, agent2, history); history holds one dict per
+    consolidation with episodes, seconds and evaluation probabilities.
+    """
+    shared = SharedValues(workers, symmetry)
+    for player in (PLAYER_X, PLAYER_O):
+        initial = Agent(player, lossval=lossval, compact=True, symmetry=symmetry).values
+        shared.data[player][:] = initial.data
+    for worker in range(workers):
+        shared.counters[worker] = 0
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+    shares = [episodes // workers + (worker < episodes % workers) for worker in range(workers)]
+    processes = [Process(target=_worker,
+                         args=(shared.name, workers, worker, shares[worker], mode, alpha, lossval,
+                               teacher_level, symmetry,
+                               None if seed is None else seed * 1000003 + worker))
+                 for worker in range(workers)]
+    history = []
+    memo = {}
+    start = time.perf_counter()
+    try:
+        for process in processes:
+            process.start()
+        boundary = consolidate_every
+        while True:
+            running = any(process.is_alive() for process in processes)
+            done = shared.episodes()
+            if done >= boundary or not running:
+                p1, p2 = consolidate(shared, alpha, lossval)
+                probs = exact_performance_vs_random(p1, p2, memo)
+                history.append({'episodes': done, 'seconds': time.perf_counter() - start,
+                                'probs': probs})
+                if out_dir is not None:
+                    p1.save(os.path.join(out_dir, 'agent1.bin'))
+                    p2.save(os.path.join(out_dir, 'agent2.bin'))
+                if verbose:
+                    print('{0} episodes, {1:.1f}s: P1-Win={2:.3f} P2-Win={3:.3f}'.format(
+                        done, history[-1]['seconds'], probs[0], probs[3]))
+                while boundary <= done:
+                    boundary += consolidate_every
+            if not running:
+                break
+            time.sleep(poll)
+        for process in processes:
+            process.join()
+            if process.exitcode != 0:
+                raise RuntimeError('hogwild worker exited with code {0}'.format(process.exitcode))
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        shared.close(unlink=True)
+    return p1, p2, history
+
+def main():
+    parser = argparse.ArgumentParser(description='Lock-free parallel training on shared value tables.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--episodes', type=int, default=100000)
+    parser.add_argument('--mode', choices=['teacher', 'self'], default='teacher')
+    parser.add_argument('--alpha', type=float, default=0.1)
+    parser.add_argument('--lossval', type=float, default=-1)
+    parser.add_argument('--teacher-level', type=float, default=0.9)
+    parser.add_argument('--symmetry', action='store_true', help='symmetry-reduced value tables')
+    parser.add_argument('--consolidate-every', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--out', default=None, help='directory for consolidated checkpoints')
+    args = parser.parse_args()
+    train_hogwild(args.workers, args.episodes, args.mode, args.alpha, args.lossval,
+                  args.teacher_level, args.symmetry, args.seed, args.consolidate_every,
+                  args.out, verbose=True)
+
+if __name__ == '__main__':
+    main()
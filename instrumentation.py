@@ -0,0 +1,91 @@
+"""
+Instrumentation for Tic-Tac-Toe RL
+Counters, timers and value statistics that agents and play() report into
+when an Instrumentation object is attached. Nothing is recorded, and no
+strings are built, while none is attached.
+"""
+
+import json
+import time
+
+class Instrumentation(object):
+    """
+    Collects named counters, timers and running statistics.
+
+    Event names used by the game code:
+        agent.exploratory, agent.greedy     moves chosen by each policy branch
+        agent.lookup_miss                   value-table misses in lookup
+        agent.backup                        |backup update| statistics
+        play.games, play.moves              games and moves played
+        play.winner.<n>                     outcomes by winner code
+        play.agent1, play.agent2            time spent choosing moves
+        play.rules, play.game               time in move/winner bookkeeping, whole games
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.timers = {}
+        self.stats = {}
+
+    def count(self, name, n=1):
+        """Add n to a counter"""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_time(self, name, seconds, calls=1):
+        """Add elapsed seconds to a timer"""
+        timer = self.timers.get(name)
+        if timer is None:
+            self.timers[name] = [calls, seconds]
+        else:
+            timer[0] += calls
+            timer[1] += seconds
+
+    def observe(self, name, value):
+        """Add one observation to a running count/sum/min/max statistic"""
+        stat = self.stats.get(name)
+        if stat is None:
+            self.stats[name] = [1, value, value, value]
+        else:
+            stat[0] += 1
+            stat[1] += value
+            if value < stat[2]:
+                stat[2] = value
+            if value > stat[3]:
+                stat[3] = value
+
+    def attach(self, *agents):
+        """Start reporting events from these agents"""
+        for agent in agents:
+            agent.instrument = self
+        return self
+
+    def detach(self, *agents):
+        """Stop reporting events from these agents"""
+        for agent in agents:
+            agent.instrument = None
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        self.counters.clear()
+        self.timers.clear()
+        self.stats.clear()
+
+    def snapshot(self):
+        """Plain-dict copy of everything recorded, suitable for JSON"""
+        return {
+            'time': time.time(),
+            'counters': dict(self.counters),
+            'timers': {name: {'calls': calls, 'total_s': total,
+                              'mean_us': total / calls * 1e6 if calls else 0.0}
+                       for name, (calls, total) in self.timers.items()},
+            'stats': {name: {'count': n, 'mean': total / n, 'min': low, 'max': high}
+                      for name, (n, total, low, high) in self.stats.items()},
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot())
+
+    def dump(self, path):
+        """Write snapshot() to path as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
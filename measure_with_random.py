@@ -3,14 +3,89 @@ Training Functions for Tic-Tac-Toe RL
 Contains evaluation functions for measuring agent performance.
 """
 
-from game_logic import play, PLAYER_X, PLAYER_O, EMPTY
+import random
+
+import numpy as np
+
+from game_logic import (play, PLAYER_X, PLAYER_O, EMPTY, DRAW, NUM_STATES, POW3, WINNERS,
+                        LAST_MOVER, EMPTY_CELLS, variants)
 from agents import RandomPlayer, Agent
+from value_table import ValueTable
+
+# Array versions of the game_logic tables for the batched simulator
+_POW3 = np.array(POW3, dtype=np.int64)
+_WINNERS = np.array(WINNERS, dtype=np.uint8)
+_DIGITS = (np.arange(NUM_STATES, dtype=np.int64)[:, None] // _POW3) % 3
+
+def value_snapshot(agent):
+    """
+    Freeze an agent's value function into a dense array indexed by state code.
+    States the agent has not visited get the value lookup() would give them.
+    """
+    defaults = np.array([agent.winnerval(w) for w in (EMPTY, PLAYER_X, PLAYER_O, DRAW)],
+                        dtype=np.float64)
+    snapshot = defaults[_WINNERS]
+    values = agent.values
+    if isinstance(values, ValueTable):
+        snapshot[np.frombuffer(values.codes, dtype=np.int32)] = np.frombuffer(values.data)
+        values = values.extra
+    if values:
+        codes = np.fromiter(values.keys(), dtype=np.int64, count=len(values))
+        vals = np.fromiter(values.values(), dtype=np.float64, count=len(values))
+        snapshot[codes] = vals
+    if agent.canon is not None:
+        snapshot = snapshot[np.asarray(agent.canon)]
+    return snapshot
 
-def measure_performance_vs_random(agent1, agent2, games=100):
+def play_batch(first, second, games, rng):
+    """
+    Play `games` games in lockstep and return an array of winners.
+    Each side is either a value snapshot (greedy play, first best cell wins
+    ties like Agent.greedy) or None for a uniform random player.
+    """
+    codes = np.zeros(games, dtype=np.int64)
+    winners = np.zeros(games, dtype=np.uint8)
+    for ply in range(9):
+        live = np.flatnonzero(winners == EMPTY)
+        if live.size == 0:
+            break
+        piece = (ply % 2) + 1
+        policy = first if ply % 2 == 0 else second
+        current = codes[live]
+        free = _DIGITS[current] == EMPTY
+        if policy is None:
+            scores = rng.random(free.shape)
+            scores[~free] = -1.0
+        else:
+            candidates = current[:, None] + piece * _POW3
+            scores = np.where(free, policy[np.where(free, candidates, 0)], -np.inf)
+        moves = scores.argmax(axis=1)
+        current = current + piece * _POW3[moves]
+        codes[live] = current
+        winners[live] = _WINNERS[current]
+    return winners
+
+def _measure_batch(agent1, agent2, games):
+    """Batched measure_performance_vs_random on frozen value snapshots"""
+    rng = np.random.default_rng(random.getrandbits(64))
+    first = play_batch(value_snapshot(agent1), None, games, rng)
+    second = play_batch(None, value_snapshot(agent2), games, rng)
+    counts = [np.count_nonzero(first == PLAYER_X), np.count_nonzero(first == PLAYER_O),
+              np.count_nonzero(first == DRAW), np.count_nonzero(second == PLAYER_O),
+              np.count_nonzero(second == PLAYER_X), np.count_nonzero(second == DRAW)]
+    return [float(c) / games for c in counts]
+
+def measure_performance_vs_random(agent1, agent2, games=100, batch=False):
     """
     Measure performance of two agents vs random players like og.py
     Returns [P1-Win, P1-Lose, P1-Draw, P2-Win, P2-Lose, P2-Draw] probabilities
+
+    With batch=True all games are played at once as NumPy arrays against a
+    frozen snapshot of each agent's values, which makes games=10000 cheap.
+    The agents themselves are not touched in that mode.
     """
+    if batch:
+        return _measure_batch(agent1, agent2, games)
     # Save original settings
     epsilon1 = agent1.epsilon
     epsilon2 = agent2.epsilon
@@ -57,4 +132,124 @@ def measure_performance_vs_random(agent1, agent2, games=100):
     agent1.learning = learning1
     agent2.learning = learning2
     
-    return probs
\ No newline at end of file
+    return probs
+
+def greedy_cell(agent, code):
+    """Cell Agent.greedy would choose at code, without updating the agent"""
+    maxval = float('-inf')
+    maxmove = None
+    for idx in EMPTY_CELLS[code]:
+        val = agent.peek_code(code + agent.player * POW3[idx])
+        if val > maxval:
+            maxval = val
+            maxmove = idx
+    return maxmove
+
+def _outcome(agent, code, table):
+    """
+    Exact (X-win, O-win, draw) probabilities from code when agent plays greedily
+    and its opponent moves uniformly at random. Results are memoized in table
+    as code -> (greedy cell or None on random turns, probabilities).
+    """
+    winner = WINNERS[code]
+    if winner == PLAYER_X:
+        return (1.0, 0.0, 0.0)
+    if winner == PLAYER_O:
+        return (0.0, 1.0, 0.0)
+    if winner == DRAW:
+        return (0.0, 0.0, 1.0)
+    entry = table.get(code)
+    if entry is not None:
+        return entry[1]
+    mover = PLAYER_X if LAST_MOVER[code] == PLAYER_O else PLAYER_O
+    if mover == agent.player:
+        cell = greedy_cell(agent, code)
+        result = _outcome(agent, code + mover * POW3[cell], table)
+    else:
+        cell = None
+        free = EMPTY_CELLS[code]
+        xwin = owin = draw = 0.0
+        for idx in free:
+            child = _outcome(agent, code + mover * POW3[idx], table)
+            xwin += child[0]
+            owin += child[1]
+            draw += child[2]
+        result = (xwin / len(free), owin / len(free), draw / len(free))
+    table[code] = (cell, result)
+    return result
+
+def _invalidate(agent, table, last_values):
+    """
+    Drop memo entries whose greedy cell changed since last_values was taken,
+    together with every memoized position that can lead to them. Only parents
+    of afterstates whose value changed need to be re-checked.
+    """
+    player = agent.player
+    changed = [code for code, val in agent.values.items() if last_values.get(code) != val]
+    if agent.canon is not None:
+        # Keys are canonical codes; the memo holds actual positions
+        changed = [variant for code in changed for variant in variants(code)]
+    stale = []
+    for code in changed:
+        for idx in range(9):
+            if code // POW3[idx] % 3 != player:
+                continue
+            parent = code - player * POW3[idx]
+            entry = table.get(parent)
+            if entry is not None and entry[0] is not None and greedy_cell(agent, parent) != entry[0]:
+                stale.append(parent)
+    while stale:
+        code = stale.pop()
+        if table.pop(code, None) is None:
+            continue
+        mover = LAST_MOVER[code]
+        for idx in range(9):
+            if code // POW3[idx] % 3 == mover:
+                stale.append(code - mover * POW3[idx])
+
+def exact_performance_vs_random(agent1, agent2, memo=None):
+    """
+    Exact version of measure_performance_vs_random for agents frozen at
+    epsilon=0. Returns [P1-Win, P1-Lose, P1-Draw, P2-Win, P2-Lose, P2-Draw].
+
+    Pass the same dict as memo at every checkpoint of one agent pair to reuse
+    the results of positions whose greedy choices have not changed since.
+    """
+    if memo is None:
+        memo = {}
+    results = []
+    for agent in (agent1, agent2):
+        table, last_values = memo.get(agent.player, ({}, {}))
+        _invalidate(agent, table, last_values)
+        results.append(_outcome(agent, 0, table))
+        memo[agent.player] = (table, agent.values.copy())
+    xwin, owin, draw = results[0]
+    first = [xwin, owin, draw]
+    xwin, owin, draw = results[1]
+    return first + [owin, xwin, draw]
+
+
+def evaluate_x_as_second(x_agent, games=100):
+    """
+    Win rate of X's values playing second (as O) vs a random X, as in the
+    position-analysis notebooks but through a view of x_agent's table rather
+    than a copy. X's table never holds O's afterstates, so this measures
+    play on default values only, not what x_agent learned.
+    """
+    x_as_o = x_agent.role_switched()
+    random_x = Agent(PLAYER_X, learning=False)
+    random_x.epsilon = 1
+    wins = sum(1 for _ in range(games) if play(random_x, x_as_o) == PLAYER_O)
+    return wins / games
+
+def evaluate_o_as_first(o_agent, games=100):
+    """
+    Win rate of O's values playing first (as X) vs a random O, as in the
+    position-analysis notebooks but through a view of o_agent's table. As
+    with evaluate_x_as_second, only default values are measured.
+    """
+    o_as_x = o_agent.role_switched()
+    random_o = Agent(PLAYER_O, learning=False)
+    random_o.epsilon = 1
+    wins = sum(1 for _ in range(games) if play(o_as_x, random_o) == PLAYER_X)
+    return wins / games
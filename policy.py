@@ -0,0 +1,99 @@
+"""
+Frozen Policies for Tic-Tac-Toe RL
+Exports a trained agent's greedy policy as a state code -> cell table, with
+single and batched move lookup for serving and a small binary file format.
+"""
+
+import struct
+from array import array
+
+import numpy as np
+
+from game_logic import EMPTY, PLAYER_X, PLAYER_O, NUM_STATES, LAST_MOVER, encode
+from measure_with_random import value_snapshot, _POW3, _WINNERS, _DIGITS
+
+POLICY_MAGIC = b'TTTP'
+POLICY_VERSION = 1
+# magic, version, player, number of table entries
+POLICY_HEADER = struct.Struct('<4sHBI')
+
+_LAST_MOVER = np.array(LAST_MOVER, dtype=np.int8)
+
+class FrozenPolicy(object):
+    """
+    Greedy move of one player for every state code, -1 where that player
+    is not to move, the game is over or the position is illegal.
+
+    A FrozenPolicy is also a player: play() calls action_code, which is one
+    table index with no value lookups, backups or allocation.
+    """
+
+    def __init__(self, player, table):
+        self.player = player
+        self.table = table
+        self.array = np.frombuffer(table, dtype=np.int8)
+
+    @classmethod
+    def from_agent(cls, agent):
+        """Freeze agent's current greedy choices (ties go to the lowest cell, as in Agent.greedy)"""
+        if getattr(agent, 'game', None) is not None:
+            raise ValueError('frozen policies are only available for the 3x3 game')
+        player = agent.player
+        snapshot = value_snapshot(agent)
+        other = PLAYER_O if player == PLAYER_X else PLAYER_X
+        states = np.flatnonzero((_LAST_MOVER == other) & (_WINNERS == EMPTY))
+        free = _DIGITS[states] == EMPTY
+        candidates = np.where(free, states[:, None] + player * _POW3, 0)
+        scores = np.where(free, snapshot[candidates], -np.inf)
+        moves = np.full(NUM_STATES, -1, dtype=np.int8)
+        moves[states] = scores.argmax(axis=1)
+        return cls(player, array('b', moves.tobytes()))
+
+    def action_code(self, code):
+        """Cell index to play at state code"""
+        idx = self.table[code]
+        if idx < 0:
+            raise ValueError('no move for {0} at state {1}: not its turn, game over or '
+                             'illegal position'.format('XO'[self.player - 1], code))
+        return idx
+
+    def action(self, state):
+        """(row, col) to play on a 3x3 board"""
+        return divmod(self.action_code(encode(state)), 3)
+
+    def episode_over(self, winner):
+        """Frozen policies do not learn"""
+        pass
+
+    def moves(self, boards, out=None):
+        """
+        Cell indices for many positions in one call. boards is an array-like
+        of state codes (shape (n,)) or of boards (shape (n, 3, 3) or (n, 9)),
+        e.g. a list of game_logic boards. out, if given, is an int8 array of
+        length n that receives the moves without a new allocation. Positions
+        where this player has no move get -1, unlike action_code, which
+        raises.
+        """
+        boards = np.asarray(boards, dtype=np.int64)
+        if boards.ndim == 1:
+            codes = boards
+        else:
+            codes = boards.reshape(len(boards), 9) @ _POW3
+        return np.take(self.array, codes, out=out)
+
+    def save(self, path):
+        """Write the policy table to a binary file"""
+        with open(path, 'wb') as f:
+            f.write(POLICY_HEADER.pack(POLICY_MAGIC, POLICY_VERSION, self.player, len(self.table)))
+            f.write(self.table.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        """Read a policy written by save()"""
+        with open(path, 'rb') as f:
+            magic, version, player, size = POLICY_HEADER.unpack(f.read(POLICY_HEADER.size))
+            if magic != POLICY_MAGIC or version != POLICY_VERSION or size != NUM_STATES:
+                raise ValueError('{0} is not a version {1} policy file'.format(path, POLICY_VERSION))
+            table = array('b')
+            table.frombytes(f.read(size))
+        return cls(player, table)
@@ -0,0 +1,270 @@
+"""
+Population Training for Tic-Tac-Toe RL
+Trains many (alpha, lossval, epsilon) agent configurations in lockstep:
+their value functions are rows of one NumPy array and every configuration's
+game against the teacher advances one ply per vectorized step.
+
+    python population.py --alphas 0.01 0.1 0.5 0.99 --lossvals -1 0 --seeds 4
+"""
+
+import argparse
+import itertools
+import json
+from array import array
+
+import numpy as np
+
+from agents import Agent, teacher_moves
+from game_logic import EMPTY, PLAYER_X, PLAYER_O, DRAW, CELLS, NUM_STATES, POW3
+from measure_with_random import _POW3, _WINNERS, _DIGITS
+from value_table import ValueTable, state_index
+
+class Population(object):
+    """
+    One X agent and one O agent per configuration, trained against teachers
+    with the same rules as Agent: an epsilon-greedy move, a backup of the
+    previous afterstate towards the best next value after greedy moves only,
+    and a final backup towards the game outcome.
+
+    configs is a sequence of (alpha, lossval, epsilon) tuples. Rows
+    0..n-1 of `values` belong to the X agents and rows n..2n-1 to the O
+    agents of the same configurations. Teachers play the precomputed
+    optimal move with probability teacher_level and a random move otherwise.
+    """
+
+    def __init__(self, configs, teacher_level=0.9, seed=None):
+        self.configs = [tuple(config) for config in configs]
+        n = len(self.configs)
+        alpha, lossval, epsilon = (np.array(column, dtype=np.float64)
+                                   for column in zip(*self.configs))
+        self.alpha = np.concatenate([alpha, alpha])
+        self.epsilon = np.concatenate([epsilon, epsilon])
+        self.learner = np.repeat(np.array([PLAYER_X, PLAYER_O], dtype=np.int64), n)
+        self.teacher_level = teacher_level
+        self.teacher = np.array(teacher_moves(), dtype=np.int64)
+        self.rng = np.random.default_rng(seed)
+        self.episodes = 0
+
+        # rewards[row, winner] is Agent.winnerval(winner) for that row's agent
+        self.rewards = np.empty((2 * n, 4), dtype=np.float64)
+        self.rewards[:, EMPTY] = 0.5
+        self.rewards[:, DRAW] = 0
+        lossvals = np.concatenate([lossval, lossval])
+        xrows = self.learner == PLAYER_X
+        self.rewards[:, PLAYER_X] = np.where(xrows, 1, lossvals)
+        self.rewards[:, PLAYER_O] = np.where(xrows, lossvals, 1)
+        # Rows live in one flat buffer; the padding lets candidate codes of
+        # occupied cells (masked out anyway) index past the last row
+        self._flat = np.zeros(2 * n * NUM_STATES + 2 * POW3[-1])
+        self._offsets = np.arange(2 * n, dtype=np.int64) * NUM_STATES
+        self.values = self._flat[:2 * n * NUM_STATES].reshape(2 * n, NUM_STATES)
+        self.values[:] = self.rewards[:, _WINNERS]
+
+    def __len__(self):
+        return len(self.configs)
+
+    def step(self, active=None):
+        """
+        Play one training game per agent (2n games at once) and apply every
+        backup. active optionally masks which rows play. Returns the array of
+        winners, EMPTY for rows that did not play.
+        """
+        n = len(self)
+        rows = 2 * n
+        flat = self._flat
+        offsets = self._offsets
+        codes = np.zeros(rows, dtype=np.int64)
+        free = np.ones((rows, CELLS), dtype=bool)
+        winners = np.zeros(rows, dtype=np.uint8)
+        live = np.ones(rows, dtype=bool) if active is None else np.array(active, dtype=bool)
+        prevstate = np.full(rows, -1, dtype=np.int64)
+        prevscore = np.zeros(rows, dtype=np.float64)
+        for ply in range(CELLS):
+            piece = (ply % 2) + 1
+            # X learners move on even plies and O learners on odd ones
+            mine = slice(0, n) if piece == PLAYER_X else slice(n, rows)
+            theirs = slice(n, rows) if piece == PLAYER_X else slice(0, n)
+            draws = self.rng.random((rows, CELLS + 1))
+            randoms = (draws[:, :CELLS] * free).argmax(axis=1)
+            draws = draws[:, CELLS]
+
+            # Learners: epsilon-greedy over afterstate values
+            candidates = offsets[mine, None] + codes[mine, None] + piece * _POW3
+            scores = np.where(free[mine], flat.take(candidates), -np.inf)
+            greedy = scores.argmax(axis=1)
+            explore = draws[mine] < self.epsilon[mine]
+            moves = np.empty(rows, dtype=np.int64)
+            moves[mine] = np.where(explore, randoms[mine], greedy)
+            # Teachers: table move, or a random one with probability 1 - level
+            moves[theirs] = np.where(draws[theirs] > self.teacher_level, randoms[theirs],
+                                     self.teacher[codes[theirs]])
+
+            # Greedy moves back the previous afterstate up towards the best value
+            backup = np.flatnonzero(live[mine] & ~explore & (prevstate[mine] >= 0))
+            if backup.size:
+                maxval = scores[backup, greedy[backup]]
+                backup += mine.start
+                flat[offsets[backup] + prevstate[backup]] += self.alpha[backup] * (maxval - prevscore[backup])
+
+            moving = np.flatnonzero(live)
+            codes[moving] += piece * _POW3[moves[moving]]
+            free[moving, moves[moving]] = False
+            moved = moving[(moving >= mine.start) & (moving < mine.stop)]
+            prevstate[moved] = codes[moved]
+            prevscore[moved] = flat[offsets[moved] + codes[moved]]
+            winners[moving] = _WINNERS[codes[moving]]
+            live[moving] = winners[moving] == EMPTY
+            if not live.any():
+                break
+
+        played = np.flatnonzero(prevstate >= 0)
+        final = self.rewards[played, winners[played]]
+        flat[offsets[played] + prevstate[played]] += self.alpha[played] * (final - prevscore[played])
+        return winners
+
+    def train(self, episodes):
+        """
+        Run `episodes` more episodes of the notebooks' schedule for every
+        configuration (even episodes train X, odd episodes train O).
+        Returns (X wins, O wins) per configuration over these episodes.
+        """
+        n = len(self)
+        wins = np.zeros((2, n), dtype=np.int64)
+        end = self.episodes + episodes
+        while self.episodes < end:
+            active = None
+            if self.episodes % 2 == 1 or self.episodes + 1 == end:
+                # Odd boundaries: only one side has an episode left to play
+                active = self.learner == (PLAYER_O if self.episodes % 2 else PLAYER_X)
+            winners = self.step(active)
+            wins[0] += winners[:n] == PLAYER_X
+            wins[1] += winners[n:] == PLAYER_O
+            self.episodes += 1 if active is not None else 2
+        return wins[0], wins[1]
+
+    def evaluate(self, games=100):
+        """
+        measure_performance_vs_random for every configuration at once, with
+        greedy frozen agents. Returns an (n, 6) array of [P1-Win, P1-Lose,
+        P1-Draw, P2-Win, P2-Lose, P2-Draw] probabilities.
+        """
+        n = len(self)
+        rows = np.repeat(np.arange(2 * n), games)
+        learner = self.learner[rows]
+        codes = np.zeros(rows.size, dtype=np.int64)
+        winners = np.zeros(rows.size, dtype=np.uint8)
+        for ply in range(9):
+            live = np.flatnonzero(winners == EMPTY)
+            if live.size == 0:
+                break
+            piece = (ply % 2) + 1
+            current = codes[live]
+            free = _DIGITS[current] == EMPTY
+            noise = self.rng.random(free.shape)
+            noise[~free] = -1.0
+            candidates = np.where(free, current[:, None] + piece * _POW3, 0)
+            scores = np.where(free, self.values[rows[live][:, None], candidates], -np.inf)
+            moves = np.where(learner[live] == piece, scores.argmax(axis=1), noise.argmax(axis=1))
+            current = current + piece * _POW3[moves]
+            codes[live] = current
+            winners[live] = _WINNERS[current]
+        winners = winners.reshape(2 * n, games)
+        first, second = winners[:n], winners[n:]
+        counts = [first == PLAYER_X, first == PLAYER_O, first == DRAW,
+                  second == PLAYER_O, second == PLAYER_X, second == DRAW]
+        return np.stack([c.mean(axis=1) for c in counts], axis=1)
+
+    def agents(self, i):
+        """Compact (X agent, O agent) copies of configuration i"""
+        alpha, lossval, epsilon = self.configs[i]
+        pair = []
+        for player, row in ((PLAYER_X, i), (PLAYER_O, len(self) + i)):
+            agent = Agent(player, lossval=lossval, alpha=alpha, compact=True)
+            agent.epsilon = epsilon
+            codes = np.frombuffer(state_index(player)[1], dtype=np.int32)
+            agent.values = ValueTable(player, array('d', self.values[row, codes].tobytes()))
+            pair.append(agent)
+        return tuple(pair)
+
+def run_population(configs, episodes=10000, eval_every=10, games=100, window=1000,
+                   teacher_level=0.9, seed=None):
+    """
+    Train every configuration on the notebooks' schedule and return one
+    result per configuration with the keys of sweep.run_experiment_with_alpha
+    (plus lossval and epsilon), so sweep.merge_runs and the plotting cells
+    can use them. Evaluation is batched, like eval_mode='batch'.
+    """
+    population = Population(configs, teacher_level, seed)
+    n = len(population)
+    perf = [[[] for _ in range(7)] for _ in range(n)]
+    training_episodes = []
+    wins1 = [[] for _ in range(n)]
+    wins2 = [[] for _ in range(n)]
+    window_games = np.zeros((2, n))
+    window_wins = np.zeros((2, n))
+    i = 0
+    while i < episodes:
+        if i % eval_every == 0:
+            probs = population.evaluate(games)
+            for c in range(n):
+                perf[c][0].append(i)
+                for idx in range(6):
+                    perf[c][idx + 1].append(float(probs[c, idx]))
+        if i % window == 0:
+            training_episodes.append(i)
+            rates = np.divide(window_wins, window_games, out=np.zeros((2, n)),
+                              where=window_games > 0)
+            for c in range(n):
+                wins1[c].append(float(rates[0, c]))
+                wins2[c].append(float(rates[1, c]))
+            window_games[:] = 0
+            window_wins[:] = 0
+        stop = min(episodes, (i // eval_every + 1) * eval_every, (i // window + 1) * window)
+        x_wins, o_wins = population.train(stop - i)
+        window_games[0] += (stop + 1) // 2 - (i + 1) // 2
+        window_games[1] += stop // 2 - i // 2
+        window_wins[0] += x_wins
+        window_wins[1] += o_wins
+        i = stop
+    results = []
+    for c, (alpha, lossval, epsilon) in enumerate(population.configs):
+        results.append({
+            'alpha': alpha,
+            'lossval': lossval,
+            'epsilon': epsilon,
+            'seed': seed,
+            'evaluation_data': perf[c],
+            'training_episodes': training_episodes,
+            'agent1_training_wins': wins1[c],
+            'agent2_training_wins': wins2[c],
+            'trained_agents': population.agents(c)
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Train a grid of agent configurations in lockstep.')
+    parser.add_argument('--alphas', type=float, nargs='+', default=[0.01, 0.1, 0.5, 0.99])
+    parser.add_argument('--lossvals', type=float, nargs='+', default=[-1])
+    parser.add_argument('--epsilons', type=float, nargs='+', default=[0.1])
+    parser.add_argument('--seeds', type=int, default=1, help='copies of every configuration')
+    parser.add_argument('--episodes', type=int, default=10000)
+    parser.add_argument('--eval-every', type=int, default=10)
+    parser.add_argument('--games', type=int, default=100, help='evaluation games per side')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--out', default=None, help='write results as JSON')
+    args = parser.parse_args()
+
+    grid = list(itertools.product(args.alphas, args.lossvals, args.epsilons))
+    results = run_population(grid * args.seeds, args.episodes, args.eval_every, args.games,
+                             seed=args.seed)
+    for result in results:
+        data = result['evaluation_data']
+        print('alpha={0} lossval={1} epsilon={2}: P1-Win={3:.3f} P2-Win={4:.3f}'.format(
+            result['alpha'], result['lossval'], result['epsilon'], data[1][-1], data[4][-1]))
+        del result['trained_agents']
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""
+Play Server for Tic-Tac-Toe RL
+asyncio server hosting many concurrent human-vs-agent games over a
+line-based protocol on TCP or a Unix socket, plus a load-test client.
+
+    python server.py serve --x-agent agent1.bin --o-agent agent2.bin --port 8765
+    python server.py loadtest --port 8765 --connections 500 --games 20
+
+Protocol (one command or reply per line):
+    NEW X | NEW O     start a game with the human playing that side
+    MOVE <row>,<col>  or MOVE <cell>, cell = row * 3 + col
+    QUIT
+Every reply is `STATE <cells> <status> [<agent cell>]` or `ERR <message>`:
+cells is the board row by row as '.', 'X' and 'O', status is TURN while
+the game goes on or X, O or DRAW once it is over, and the agent's move is
+appended whenever the server played one. A line longer than the stream
+limit (64 KiB) gets `ERR line too long` and the connection is closed.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from agents import Agent
+from game_logic import EMPTY, PLAYER_X, PLAYER_O, DRAW, POW3, WINNERS, EMPTY_CELLS
+from policy import FrozenPolicy, POLICY_MAGIC
+from solver import PerfectPlayer
+
+SYMBOLS = '.XO'
+STATUS = {EMPTY: 'TURN', PLAYER_X: 'X', PLAYER_O: 'O', DRAW: 'DRAW'}
+
+def load_player(path, player):
+    """
+    Read-only player for one side from a policy file or an agent checkpoint
+    (frozen on load), or perfect play if path is None.
+    """
+    if path is None:
+        return PerfectPlayer(player, random_ties=False)
+    with open(path, 'rb') as f:
+        magic = f.read(len(POLICY_MAGIC))
+    if magic == POLICY_MAGIC:
+        policy = FrozenPolicy.load(path)
+    else:
+        policy = FrozenPolicy.from_agent(Agent.load(path))
+    if policy.player != player:
+        raise ValueError('{0} plays {1}, not {2}'.format(path, SYMBOLS[policy.player],
+                                                         SYMBOLS[player]))
+    return policy
+
+def board_string(code):
+    """The 9 cells of a state code as '.', 'X' and 'O'"""
+    return ''.join(SYMBOLS[code // POW3[idx] % 3] for idx in range(9))
+
+class Session(object):
+    """One game on one connection: state code and the side the human plays"""
+
+    __slots__ = ('code', 'human', 'winner')
+
+    def __init__(self, human):
+        self.code = 0
+        self.human = human
+        self.winner = EMPTY
+
+    def moves(self):
+        """Pieces on the board"""
+        return 9 - len(EMPTY_CELLS[self.code])
+
+    def apply(self, idx, piece):
+        """Place piece on empty cell idx"""
+        self.code += piece * POW3[idx]
+        self.winner = WINNERS[self.code]
+
+class PlayServer(object):
+    """
+    Serves games against one shared read-only player per side. Agent moves
+    are O(1) table lookups, so they are answered inline without blocking
+    the event loop; a connection only ever waits on its own socket.
+    """
+
+    def __init__(self, players):
+        self.players = players
+        self.games = 0
+        self.connections = 0
+
+    def reply(self, session, agent_move=None):
+        line = 'STATE {0} {1}'.format(board_string(session.code), STATUS[session.winner])
+        if agent_move is not None:
+            line += ' {0}'.format(agent_move)
+        return line
+
+    def agent_turn(self, session):
+        """Let the agent move if it is its turn; returns the cell or None"""
+        piece = PLAYER_O if session.human == PLAYER_X else PLAYER_X
+        if session.winner != EMPTY or session.moves() % 2 != piece - 1:
+            return None
+        idx = self.players[piece].action_code(session.code)
+        session.apply(idx, piece)
+        return idx
+
+    def command(self, session, line):
+        """Handle one request line; returns (session, reply)"""
+        parts = line.split()
+        if not parts:
+            return session, 'ERR empty command'
+        verb = parts[0].upper()
+        if verb == 'NEW':
+            side = parts[1].upper() if len(parts) > 1 else 'X'
+            if side not in ('X', 'O'):
+                return session, 'ERR side must be X or O'
+            session = Session(SYMBOLS.index(side))
+            self.games += 1
+            return session, self.reply(session, self.agent_turn(session))
+        if verb == 'MOVE':
+            if session is None:
+                return session, 'ERR no game, send NEW X or NEW O'
+            if session.winner != EMPTY:
+                return session, 'ERR game over, send NEW to play again'
+            try:
+                coords = [int(part) for part in ''.join(parts[1:]).split(',')]
+            except ValueError:
+                return session, 'ERR move must be <row>,<col> or <cell>'
+            if len(coords) == 2 and all(0 <= c <= 2 for c in coords):
+                idx = coords[0] * 3 + coords[1]
+            elif len(coords) == 1 and 0 <= coords[0] <= 8:
+                idx = coords[0]
+            else:
+                return session, 'ERR move must be <row>,<col> or <cell>'
+            if idx not in EMPTY_CELLS[session.code]:
+                return session, 'ERR cell {0} is taken'.format(idx)
+            session.apply(idx, session.human)
+            return session, self.reply(session, self.agent_turn(session))
+        return session, 'ERR unknown command {0}'.format(verb)
+
+    async def handle(self, reader, writer):
+        """Run one client connection until QUIT or EOF"""
+        self.connections += 1
+        session = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode('ascii', 'replace').strip()
+                if line.upper() == 'QUIT':
+                    break
+                session, response = self.command(session, line)
+                writer.write(response.encode('ascii') + b'\n')
+                await writer.drain()
+        except ValueError:
+            # Line longer than the stream limit; the rest of it cannot be resynced
+            try:
+                writer.write(b'ERR line too long\n')
+                await writer.drain()
+            except ConnectionError:
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765, unix=None):
+        """Start listening on a Unix socket path if given, else on host:port"""
+        if unix is not None:
+            return await asyncio.start_unix_server(self.handle, path=unix, backlog=4096)
+        return await asyncio.start_server(self.handle, host, port, backlog=4096)
+
+async def serve(players, host='127.0.0.1', port=8765, unix=None):
+    """Run a PlayServer forever"""
+    server = await PlayServer(players).start(host, port, unix)
+    async with server:
+        await server.serve_forever()
+
+async def _open(host, port, unix):
+    if unix is not None:
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection(host, port)
+
+async def _client(host, port, unix, games, latencies, rng):
+    """Play `games` random games as alternating sides on one connection"""
+    reader, writer = await _open(host, port, unix)
+    finished = 0
+    for game in range(games):
+        writer.write('NEW {0}\n'.format('XO'[game % 2]).encode('ascii'))
+        await writer.drain()
+        reply = (await reader.readline()).decode('ascii').split()
+        while reply[2] == 'TURN':
+            free = [idx for idx, cell in enumerate(reply[1]) if cell == '.']
+            writer.write('MOVE {0}\n'.format(rng.choice(free)).encode('ascii'))
+            start = time.perf_counter()
+            await writer.drain()
+            reply = (await reader.readline()).decode('ascii').split()
+            latencies.append(time.perf_counter() - start)
+            if reply[0] != 'STATE':
+                raise RuntimeError(' '.join(reply))
+        finished += 1
+    writer.write(b'QUIT\n')
+    await writer.drain()
+    writer.close()
+    return finished
+
+async def load_test(host='127.0.0.1', port=8765, unix=None, connections=100, games=10, seed=None):
+    """
+    Run `connections` concurrent clients playing `games` random games each
+    and return (games per second, p50 and p99 move latency in milliseconds,
+    moves).
+    """
+    rng = random.Random(seed)
+    latencies = []
+    start = time.perf_counter()
+    done = await asyncio.gather(*[_client(host, port, unix, games, latencies,
+                                          random.Random(rng.getrandbits(64)))
+                                  for _ in range(connections)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1e3
+    return sum(done) / elapsed, percentile(0.5), percentile(0.99), len(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve trained agents to many concurrent players.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name in ('serve', 'loadtest'):
+        command = commands.add_parser(name)
+        command.add_argument('--host', default='127.0.0.1')
+        command.add_argument('--port', type=int, default=8765)
+        command.add_argument('--unix', default=None, help='Unix socket path instead of TCP')
+        if name == 'serve':
+            command.add_argument('--x-agent', default=None,
+                                 help='agent checkpoint or policy file playing X (default: perfect play)')
+            command.add_argument('--o-agent', default=None,
+                                 help='agent checkpoint or policy file playing O (default: perfect play)')
+        else:
+            command.add_argument('--connections', type=int, default=100)
+            command.add_argument('--games', type=int, default=10, help='games per connection')
+            command.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        players = {PLAYER_X: load_player(args.x_agent, PLAYER_X),
+                   PLAYER_O: load_player(args.o_agent, PLAYER_O)}
+        asyncio.run(serve(players, args.host, args.port, args.unix))
+        return
+    rate, p50, p99, moves = asyncio.run(load_test(args.host, args.port, args.unix,
+                                                  args.connections, args.games, args.seed))
+    print('{0:.1f} games/s, {1} moves, move latency p50 {2:.3f} ms, p99 {3:.3f} ms'.format(
+        rate, moves, p50, p99))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Perfect Play for Tic-Tac-Toe RL
+Negamax search with alpha-beta pruning and a transposition table keyed by
+state code, a PerfectPlayer built on it, and an optimality-gap metric that
+counts the positions where an agent's greedy move gives away value.
+"""
+
+import random
+
+import numpy as np
+
+from game_logic import (EMPTY, PLAYER_X, PLAYER_O, DRAW, NUM_STATES, POW3, WINNERS,
+                        LAST_MOVER, EMPTY_CELLS, encode)
+from measure_with_random import value_snapshot, _POW3, _DIGITS
+
+# Transposition table flags
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# state code -> (value, flag), shared by every search in the process
+_TABLE = {}
+
+# Optimal cells for the side to move in every state code, built on first use
+_OPTIMAL = []
+_OPTIMAL_MASK = []
+
+# player -> codes of every legal non-terminal state with that player to move
+_DECISIONS = {}
+
+def to_move(code):
+    """Player whose turn it is at code"""
+    return PLAYER_X if LAST_MOVER[code] == PLAYER_O else PLAYER_O
+
+def negamax(code, alpha=-1, beta=1):
+    """
+    Game value of code for the side to move with perfect play by both sides:
+    1 win, 0 draw, -1 loss. Values between alpha and beta are exact, and
+    with the default full window every result is.
+    """
+    winner = WINNERS[code]
+    if winner != EMPTY:
+        # Whoever completed a line has just moved
+        return 0 if winner == DRAW else -1
+    entry = _TABLE.get(code)
+    if entry is not None:
+        value, flag = entry
+        if flag == EXACT:
+            return value
+        if flag == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return value
+    start = alpha
+    mover = to_move(code)
+    best = -2
+    for idx in EMPTY_CELLS[code]:
+        value = -negamax(code + mover * POW3[idx], -beta, -alpha)
+        if value > best:
+            best = value
+            if value > alpha:
+                alpha = value
+                if alpha >= beta:
+                    break
+    if best <= start:
+        flag = UPPER
+    elif best >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    _TABLE[code] = (best, flag)
+    return best
+
+def move_values(code):
+    """Cell index -> game value for the side to move after playing there"""
+    mover = to_move(code)
+    return {idx: -negamax(code + mover * POW3[idx]) for idx in EMPTY_CELLS[code]}
+
+def optimal_moves():
+    """
+    Tuple of value-maximizing cells for the side to move in every state
+    code (empty where the game is over or the position is illegal).
+    Solved once per process; later lookups are a list index.
+    """
+    if not _OPTIMAL:
+        moves = [()] * NUM_STATES
+        for code in range(NUM_STATES):
+            if LAST_MOVER[code] == -1 or WINNERS[code] != EMPTY:
+                continue
+            values = move_values(code)
+            best = max(values.values())
+            moves[code] = tuple(idx for idx, value in values.items() if value == best)
+        _OPTIMAL[:] = moves
+    return _OPTIMAL
+
+def optimal_mask():
+    """(NUM_STATES, 9) boolean array form of optimal_moves()"""
+    if not _OPTIMAL_MASK:
+        mask = np.zeros((NUM_STATES, 9), dtype=bool)
+        for code, moves in enumerate(optimal_moves()):
+            mask[code, list(moves)] = True
+        _OPTIMAL_MASK.append(mask)
+    return _OPTIMAL_MASK[0]
+
+class PerfectPlayer(object):
+    """
+    Player that always makes a value-maximizing move, for either side.
+    Ties between equally good moves are broken at random, or by the lowest
+    cell index with random_ties=False.
+    """
+
+    def __init__(self, player=None, random_ties=True):
+        self.player = player
+        self.random_ties = random_ties
+        self.moves = optimal_moves()
+
+    def action(self, state):
+        """Interface method for the list engine - returns (row, col)"""
+        return divmod(self.action_code(encode(state)), 3)
+
+    def action_code(self, code):
+        """Interface method for the integer engine - returns a cell index"""
+        moves = self.moves[code]
+        if self.random_ties:
+            return random.choice(moves)
+        return moves[0]
+
+    def episode_over(self, winner):
+        """No learning for the perfect player"""
+        pass
+
+def decision_states(player, agent_values=None):
+    """
+    Array of the non-terminal state codes where `player` is to move. With
+    agent_values (a value_snapshot array) only states reachable when that
+    player moves greedily and the opponent plays anything are kept.
+    """
+    if agent_values is None:
+        if player not in _DECISIONS:
+            _DECISIONS[player] = np.array([code for code in range(NUM_STATES)
+                                           if LAST_MOVER[code] != -1 and WINNERS[code] == EMPTY
+                                           and to_move(code) == player], dtype=np.int64)
+        return _DECISIONS[player]
+    seen = set()
+    frontier = [0]
+    while frontier:
+        code = frontier.pop()
+        if code in seen or WINNERS[code] != EMPTY:
+            continue
+        seen.add(code)
+        mover = to_move(code)
+        free = EMPTY_CELLS[code]
+        if mover == player:
+            scores = [agent_values[code + mover * POW3[idx]] for idx in free]
+            free = (free[scores.index(max(scores))],)
+        frontier.extend(code + mover * POW3[idx] for idx in free)
+    return np.array(sorted(code for code in seen if to_move(code) == player), dtype=np.int64)
+
+def optimality_gap(agent, on_policy=False):
+    """
+    (suboptimal, total): how many positions with `agent` to move have a
+    greedy move (the one Agent.greedy picks) that is worse than perfect
+    play. By default every legal position counts; on_policy=True counts
+    only positions reachable while the agent itself plays greedily.
+    """
+    snapshot = value_snapshot(agent)
+    states = decision_states(agent.player, snapshot if on_policy else None)
+    free = _DIGITS[states] == EMPTY
+    candidates = np.where(free, states[:, None] + agent.player * _POW3, 0)
+    scores = np.where(free, snapshot[candidates], -np.inf)
+    greedy = scores.argmax(axis=1)
+    good = optimal_mask()[states, greedy]
+    return int(np.count_nonzero(~good)), int(states.size)
@@ -0,0 +1,162 @@
+"""
+Parallel Alpha Sweeps for Tic-Tac-Toe RL
+Runs independent (alpha, seed, episodes) training configurations across
+worker processes and merges them into the notebooks' result structure.
+"""
+
+import argparse
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from agents import Agent, Teacher
+from game_logic import play, PLAYER_X, PLAYER_O
+from measure_with_random import measure_performance_vs_random
+
+def run_experiment_with_alpha(alpha_value, episodes=10000, seed=None, games=100, batch=False):
+    """
+    Run training experiment with specific alpha value (same schedule as
+    tictactoe_experiments.ipynb). seed reseeds the random module first so
+    each worker process gets its own reproducible stream.
+    """
+    random.seed(seed)
+
+    # Create agents with specified alpha
+    p1 = Agent(PLAYER_X, lossval=-1, alpha=alpha_value)
+    p2 = Agent(PLAYER_O, lossval=-1, alpha=alpha_value)
+    teacher_o = Teacher(level=0.9)
+    teacher_x = Teacher(level=0.9)
+
+    # Track data
+    perf = [[] for _ in range(7)]  # episode, p1-win, p1-lose, p1-draw, p2-win, p2-lose, p2-draw
+    training_episodes = []
+    agent1_training_wins = []
+    agent2_training_wins = []
+    agent1_recent_results = []
+    agent2_recent_results = []
+
+    for i in range(episodes):
+        # Evaluate vs random every 10 episodes
+        if i % 10 == 0:
+            probs = measure_performance_vs_random(p1, p2, games=games, batch=batch)
+            perf[0].append(i)
+            for idx, x in enumerate(probs):
+                perf[idx + 1].append(x)
+
+        # Track training vs teacher every 1000 episodes
+        if i % 1000 == 0:
+            training_episodes.append(i)
+            if agent1_recent_results:
+                agent1_wins = sum(1 for w in agent1_recent_results if w == PLAYER_X)
+                agent1_training_wins.append(agent1_wins / len(agent1_recent_results))
+            else:
+                agent1_training_wins.append(0)
+
+            if agent2_recent_results:
+                agent2_wins = sum(1 for w in agent2_recent_results if w == PLAYER_O)
+                agent2_training_wins.append(agent2_wins / len(agent2_recent_results))
+            else:
+                agent2_training_wins.append(0)
+
+            agent1_recent_results = []
+            agent2_recent_results = []
+
+        # Training: alternating agent vs teacher
+        if i % 2 == 0:
+            winner = play(p1, teacher_o)
+            p1.episode_over(winner)
+            agent1_recent_results.append(winner)
+        else:
+            winner = play(teacher_x, p2)
+            p2.episode_over(winner)
+            agent2_recent_results.append(winner)
+
+    return {
+        'alpha': alpha_value,
+        'seed': seed,
+        'evaluation_data': perf,
+        'training_episodes': training_episodes,
+        'agent1_training_wins': agent1_training_wins,
+        'agent2_training_wins': agent2_training_wins,
+        'trained_agents': (p1, p2)
+    }
+
+def iter_sweep(alpha_values, seeds=(None,), episodes=10000, max_workers=None, **kwargs):
+    """
+    Run every (alpha, seed) configuration in a process pool and yield
+    (alpha, seed, result) tuples as soon as each run finishes.
+    Extra keyword arguments are passed to run_experiment_with_alpha.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for alpha in alpha_values:
+            for seed in seeds:
+                future = pool.submit(run_experiment_with_alpha, alpha, episodes, seed, **kwargs)
+                futures[future] = (alpha, seed)
+        for future in as_completed(futures):
+            alpha, seed = futures[future]
+            yield alpha, seed, future.result()
+
+def _mean_series(series):
+    """Element-wise mean of equally long lists"""
+    return [sum(values) / len(values) for values in zip(*series)]
+
+def merge_runs(runs):
+    """
+    Merge runs of one alpha into a single result with the keys the plotting
+    cells read, averaging every curve over seeds. Individual runs are kept
+    under 'runs'.
+    """
+    runs = sorted(runs, key=lambda run: str(run['seed']))
+    evaluation_data = [runs[0]['evaluation_data'][0]]
+    for idx in range(1, len(runs[0]['evaluation_data'])):
+        evaluation_data.append(_mean_series([run['evaluation_data'][idx] for run in runs]))
+    return {
+        'alpha': runs[0]['alpha'],
+        'seeds': [run['seed'] for run in runs],
+        'evaluation_data': evaluation_data,
+        'training_episodes': runs[0]['training_episodes'],
+        'agent1_training_wins': _mean_series([run['agent1_training_wins'] for run in runs]),
+        'agent2_training_wins': _mean_series([run['agent2_training_wins'] for run in runs]),
+        'runs': runs
+    }
+
+def run_sweep(alpha_values, seeds=(None,), episodes=10000, max_workers=None, callback=None, **kwargs):
+    """
+    Parallel replacement for the notebooks' serial alpha loop. Returns
+    {alpha: merged result}; callback(alpha, seed, result) is called for each
+    run as it arrives.
+    """
+    collected = {alpha: [] for alpha in alpha_values}
+    for alpha, seed, result in iter_sweep(alpha_values, seeds, episodes, max_workers, **kwargs):
+        collected[alpha].append(result)
+        if callback is not None:
+            callback(alpha, seed, result)
+    return {alpha: merge_runs(runs) for alpha, runs in collected.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description='Run an alpha sweep across all cores.')
+    parser.add_argument('--alphas', type=float, nargs='+', default=[0.01, 0.1, 0.5, 0.99])
+    parser.add_argument('--seeds', type=int, default=1, help='number of seeds per alpha')
+    parser.add_argument('--episodes', type=int, default=10000)
+    parser.add_argument('--games', type=int, default=100, help='evaluation games per checkpoint')
+    parser.add_argument('--batch', action='store_true', help='use batched NumPy evaluation')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default=None, help='write merged results as JSON')
+    args = parser.parse_args()
+
+    def report(alpha, seed, result):
+        data = result['evaluation_data']
+        print(f'alpha={alpha} seed={seed}: P1-Win={data[1][-1]:.3f} P2-Win={data[4][-1]:.3f}')
+
+    results = run_sweep(args.alphas, range(args.seeds), args.episodes, args.workers,
+                        callback=report, games=args.games, batch=args.batch)
+    if args.out:
+        for merged in results.values():
+            for run in merged['runs']:
+                del run['trained_agents']
+        with open(args.out, 'w') as f:
+            json.dump({str(alpha): merged for alpha, merged in results.items()}, f)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+Headless Training Driver for Tic-Tac-Toe RL
+Runs the notebooks' agent-vs-teacher schedule from the command line,
+streaming metrics to disk and checkpointing so long runs can resume.
+
+Files written to the output directory:
+    evaluation.csv   one row per evaluation vs random players
+    training.jsonl   one record per window of training games vs teachers
+    agent1.bin, agent2.bin, state.json   latest checkpoint
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import time
+
+from agents import Agent, Teacher
+from game_logic import play, PLAYER_X, PLAYER_O
+from measure_with_random import measure_performance_vs_random, exact_performance_vs_random
+from instrumentation import Instrumentation
+from background_eval import BackgroundEvaluator
+
+EVALUATION_FIELDS = ['episode', 'p1_win', 'p1_lose', 'p1_draw', 'p2_win', 'p2_lose', 'p2_draw']
+
+class WindowStats(object):
+    """Training win counts since the last window boundary (constant memory)"""
+
+    def __init__(self, games1=0, wins1=0, games2=0, wins2=0):
+        self.games1 = games1
+        self.wins1 = wins1
+        self.games2 = games2
+        self.wins2 = wins2
+
+    def record(self, agent, winner):
+        """Count one training game of agent 1 (X) or agent 2 (O)"""
+        if agent == 1:
+            self.games1 += 1
+            self.wins1 += winner == PLAYER_X
+        else:
+            self.games2 += 1
+            self.wins2 += winner == PLAYER_O
+
+    def rates(self):
+        """Win rates like the notebooks' agent*_training_wins (0 if no games)"""
+        rate1 = self.wins1 / self.games1 if self.games1 else 0
+        rate2 = self.wins2 / self.games2 if self.games2 else 0
+        return rate1, rate2
+
+    def state(self):
+        return [self.games1, self.wins1, self.games2, self.wins2]
+
+def _truncate(path, start, episode_of):
+    """Drop records at or after episode `start` written after the checkpoint"""
+    if not os.path.exists(path):
+        return
+    with open(path, newline='') as f:
+        lines = f.readlines()
+    header = lines[:1] if path.endswith('.csv') else []
+    body = lines[len(header):]
+    with open(path, 'w', newline='') as f:
+        f.writelines(header + [line for line in body if episode_of(line) < start])
+
+def save_checkpoint(out_dir, p1, p2, episode, window):
+    """Write both agents and the driver state needed to resume at `episode`"""
+    p1.save(os.path.join(out_dir, 'agent1.bin'))
+    p2.save(os.path.join(out_dir, 'agent2.bin'))
+    version, internal, gauss = random.getstate()
+    state = {'episode': episode, 'window': window.state(),
+             'random_state': [version, list(internal), gauss]}
+    tmp = os.path.join(out_dir, 'state.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, os.path.join(out_dir, 'state.json'))
+
+def load_checkpoint(out_dir):
+    """Return (p1, p2, next episode, WindowStats) and restore the RNG"""
+    with open(os.path.join(out_dir, 'state.json')) as f:
+        state = json.load(f)
+    version, internal, gauss = state['random_state']
+    random.setstate((version, tuple(internal), gauss))
+    p1 = Agent.load(os.path.join(out_dir, 'agent1.bin'), mmap=False)
+    p2 = Agent.load(os.path.join(out_dir, 'agent2.bin'), mmap=False)
+    return p1, p2, state['episode'], WindowStats(*state['window'])
+
+def run_training(out_dir, alpha=0.99, lossval=-1, episodes=10000, eval_every=10, games=100,
+                 eval_mode='sample', window=1000, teacher_level=0.9, precomputed_teacher=False,
+                 compact=False, symmetry=False, checkpoint_every=10000, seed=None, resume=False,
+                 verbose=True, profile=None, eval_workers=0):
+    """
+    Train agent1 (X) and agent2 (O) against teachers on alternating episodes,
+    evaluating vs random players every eval_every episodes as in
+    tictactoe_experiments.ipynb. eval_mode is 'sample', 'batch' or 'exact'.
+    profile names a JSON file that receives an Instrumentation snapshot of
+    the training games (plus total evaluation time) at every checkpoint.
+    eval_workers > 0 evaluates value snapshots in that many background
+    processes instead of pausing training; rows are written as they arrive
+    and all of them are in evaluation.csv by every checkpoint.
+    Returns the trained (agent1, agent2).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    eval_path = os.path.join(out_dir, 'evaluation.csv')
+    train_path = os.path.join(out_dir, 'training.jsonl')
+    if resume and os.path.exists(os.path.join(out_dir, 'state.json')):
+        p1, p2, start, stats = load_checkpoint(out_dir)
+        _truncate(eval_path, start, lambda line: int(line.split(',')[0]))
+        _truncate(train_path, start, lambda line: json.loads(line)['episode'])
+        if verbose:
+            print('Resuming at episode {0}'.format(start))
+    else:
+        random.seed(seed)
+        p1 = Agent(PLAYER_X, lossval=lossval, alpha=alpha, compact=compact, symmetry=symmetry)
+        p2 = Agent(PLAYER_O, lossval=lossval, alpha=alpha, compact=compact, symmetry=symmetry)
+        start = 0
+        stats = WindowStats()
+        with open(eval_path, 'w', newline='') as f:
+            csv.writer(f).writerow(EVALUATION_FIELDS)
+        open(train_path, 'w').close()
+    teacher_o = Teacher(level=teacher_level, precomputed=precomputed_teacher)
+    teacher_x = Teacher(level=teacher_level, precomputed=precomputed_teacher)
+    memo = {}
+    instrument = None
+    if profile is not None:
+        instrument = Instrumentation().attach(p1, p2)
+    evaluator = None
+    if eval_workers > 0:
+        evaluator = BackgroundEvaluator(eval_mode, games, eval_workers, seed=seed)
+
+    try:
+        with open(eval_path, 'a', newline='') as eval_file, open(train_path, 'a') as train_file:
+            writer = csv.writer(eval_file)
+            for i in range(start, episodes):
+                # Evaluate vs random every eval_every episodes
+                if i % eval_every == 0:
+                    if verbose and i % 1000 == 0:
+                        print('Episode: {0}'.format(i))
+                    if instrument is not None:
+                        instrument.detach(p1, p2)
+                        before = time.perf_counter()
+                    if evaluator is not None:
+                        evaluator.submit(i, p1, p2)
+                        rows = evaluator.poll()
+                    elif eval_mode == 'exact':
+                        rows = [(i, exact_performance_vs_random(p1, p2, memo))]
+                    else:
+                        rows = [(i, measure_performance_vs_random(p1, p2, games=games,
+                                                                  batch=eval_mode == 'batch'))]
+                    if instrument is not None:
+                        instrument.add_time('train.evaluation', time.perf_counter() - before)
+                        instrument.attach(p1, p2)
+                    for episode, probs in rows:
+                        writer.writerow([episode] + probs)
+                    eval_file.flush()
+
+                # Close the training window vs teacher
+                if i % window == 0:
+                    rate1, rate2 = stats.rates()
+                    record = {'episode': i, 'agent1_games': stats.games1, 'agent1_training_wins': rate1,
+                              'agent2_games': stats.games2, 'agent2_training_wins': rate2}
+                    train_file.write(json.dumps(record) + '\n')
+                    train_file.flush()
+                    stats = WindowStats()
+
+                # Training: alternating agent vs teacher
+                if i % 2 == 0:
+                    winner = play(p1, teacher_o, instrument)
+                    p1.episode_over(winner)
+                    stats.record(1, winner)
+                else:
+                    winner = play(teacher_x, p2, instrument)
+                    p2.episode_over(winner)
+                    stats.record(2, winner)
+
+                if (i + 1) % checkpoint_every == 0 or i + 1 == episodes:
+                    if evaluator is not None:
+                        for episode, probs in evaluator.drain():
+                            writer.writerow([episode] + probs)
+                        eval_file.flush()
+                    save_checkpoint(out_dir, p1, p2, i + 1, stats)
+                    if instrument is not None:
+                        instrument.dump(profile)
+    finally:
+        if evaluator is not None:
+            evaluator.close()
+        if instrument is not None:
+            instrument.detach(p1, p2)
+    return p1, p2
+
+def main():
+    parser = argparse.ArgumentParser(description='Train Tic-Tac-Toe agents against teachers.')
+    parser.add_argument('out_dir', help='directory for metrics and checkpoints')
+    parser.add_argument('--alpha', type=float, default=0.99)
+    parser.add_argument('--lossval', type=float, default=-1)
+    parser.add_argument('--episodes', type=int, default=10000)
+    parser.add_argument('--eval-every', type=int, default=10)
+    parser.add_argument('--games', type=int, default=100, help='games per evaluation side')
+    parser.add_argument('--eval-mode', choices=['sample', 'batch', 'exact'], default='sample')
+    parser.add_argument('--window', type=int, default=1000, help='episodes per training-win window')
+    parser.add_argument('--teacher-level', type=float, default=0.9)
+    parser.add_argument('--precomputed-teacher', action='store_true')
+    parser.add_argument('--compact', action='store_true', help='array-backed value tables')
+    parser.add_argument('--symmetry', action='store_true', help='symmetry-reduced value tables')
+    parser.add_argument('--checkpoint-every', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--resume', action='store_true', help='continue from the checkpoint in out_dir')
+    parser.add_argument('--eval-workers', type=int, default=0,
+                        help='evaluate in this many background processes')
+    parser.add_argument('--profile', default=None, help='write instrumentation snapshots to this JSON file')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+    run_training(args.out_dir, alpha=args.alpha, lossval=args.lossval, episodes=args.episodes,
+                 eval_every=args.eval_every, games=args.games, eval_mode=args.eval_mode,
+                 window=args.window, teacher_level=args.teacher_level,
+                 precomputed_teacher=args.precomputed_teacher, compact=args.compact,
+                 symmetry=args.symmetry, checkpoint_every=args.checkpoint_every, seed=args.seed,
+                 resume=args.resume, verbose=not args.quiet, profile=args.profile,
+                 eval_workers=args.eval_workers)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+Compact Value Tables for Tic-Tac-Toe Agents
+A dict-like value function stored as one contiguous float array, addressed
+through a dense index from state code to slot, a size-bounded table for
+boards too large to enumerate, and a read-only view for role switching.
+"""
+
+from array import array
+from collections import OrderedDict
+
+from game_logic import NUM_STATES, LAST_MOVER, WINNERS, canonical_codes
+
+# Dense state indexes keyed by (player, symmetric), built once per process
+_INDEXES = {}
+
+def state_index(player, symmetric=False):
+    """
+    Return (index, codes) for the states `player` can leave behind: codes
+    lists those state codes in ascending order and index[code] is the
+    position of code in that list, or -1 if it has no slot.
+
+    With symmetric=True only canonical codes get a slot and every symmetric
+    variant is indexed to the slot of its canonical code.
+    """
+    key = (player, symmetric)
+    if key not in _INDEXES:
+        index = array('i', [-1]) * NUM_STATES
+        codes = array('i')
+        for code in range(NUM_STATES):
+            if LAST_MOVER[code] == player:
+                if not symmetric:
+                    index[code] = len(codes)
+                    codes.append(code)
+                elif canonical_codes()[code] == code:
+                    codes.append(code)
+        if symmetric:
+            canon = canonical_codes()
+            slots = {code: slot for slot, code in enumerate(codes)}
+            for code in range(NUM_STATES):
+                if canon[code] in slots:
+                    index[code] = slots[canon[code]]
+        _INDEXES[key] = (index, codes)
+    return _INDEXES[key]
+
+class ValueTable(object):
+    """
+    Value function for one player backed by a float array.
+
+    Supports the dict operations Agent and the notebooks use (lookup,
+    assignment, `in`, get, items, copy). Codes without a slot, which only
+    show up after an illegal overwrite by the teacher, go to a small
+    overflow dict so that lookups never fail.
+    """
+
+    __slots__ = ('player', 'symmetric', 'index', 'codes', 'data', 'extra')
+
+    def __init__(self, player, data, extra=None, symmetric=False):
+        self.player = player
+        self.symmetric = symmetric
+        self.index, self.codes = state_index(player, symmetric)
+        self.data = data
+        self.extra = {} if extra is None else extra
+
+    @classmethod
+    def initial(cls, player, winnerval, symmetric=False):
+        """Table with every slot set to winnerval of its game outcome"""
+        index, codes = state_index(player, symmetric)
+        return cls(player, array('d', [winnerval(WINNERS[code]) for code in codes]),
+                   symmetric=symmetric)
+
+    def __getitem__(self, code):
+        slot = self.index[code]
+        if slot < 0:
+            return self.extra[code]
+        return self.data[slot]
+
+    def __setitem__(self, code, value):
+        slot = self.index[code]
+        if slot < 0:
+            self.extra[code] = value
+        else:
+            self.data[slot] = value
+
+    def __contains__(self, code):
+        return self.index[code] >= 0 or code in self.extra
+
+    def __len__(self):
+        return len(self.data) + len(self.extra)
+
+    def __iter__(self):
+        yield from self.codes
+        yield from self.extra
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        yield from self.data
+        yield from self.extra.values()
+
+    def items(self):
+        yield from zip(self.codes, self.data)
+        yield from self.extra.items()
+
+    def get(self, code, default=None):
+        if code in self:
+            return self[code]
+        return default
+
+    def copy(self):
+        """Snapshot: one buffer copy, sharing the immutable index"""
+        return ValueTable(self.player, array('d', self.data), dict(self.extra), self.symmetric)
+
+
+class BoundedValues(OrderedDict):
+    """
+    Lazily filled value function that keeps at most max_states entries,
+    evicting the least recently used state when full. An evicted state is
+    simply re-created with its initial value if it is visited again.
+    """
+
+    def __init__(self, max_states):
+        super(BoundedValues, self).__init__()
+        self.max_states = max_states
+
+    def __getitem__(self, code):
+        value = OrderedDict.__getitem__(self, code)
+        self.move_to_end(code)
+        return value
+
+    def __setitem__(self, code, value):
+        OrderedDict.__setitem__(self, code, value)
+        self.move_to_end(code)
+        if len(self) > self.max_states:
+            self.popitem(last=False)
+
+    def copy(self):
+        table = BoundedValues(self.max_states)
+        for code, value in self.items():
+            OrderedDict.__setitem__(table, code, value)
+        return table
+
+    def __reduce__(self):
+        return (self.__class__, (self.max_states,), None, None, iter(self.items()))
+
+
+class RoleSwitchedValues(object):
+    """
+    Read-only view of another agent's value table for an agent in the other
+    seat. Lookups hit the source table first; anything the viewing agent
+    writes (its default values for unseen states) goes to a small overlay
+    dict, so the source is never modified.
+
+    A table only holds afterstates of its own seat, which never occur as the
+    other seat's afterstates (the piece counts differ), so in practice every
+    lookup misses the source and the viewer plays on its default values.
+    The view only reproduces the notebooks' role-switch metric without a
+    copy; it does not reuse learned values, and that metric does not depend
+    on training.
+    """
+
+    __slots__ = ('source', 'overlay')
+
+    def __init__(self, source):
+        self.source = source
+        self.overlay = {}
+
+    def __getitem__(self, code):
+        overlay = self.overlay
+        if code in overlay:
+            return overlay[code]
+        return self.source[code]
+
+    def __setitem__(self, code, value):
+        self.overlay[code] = value
+
+    def __contains__(self, code):
+        return code in self.overlay or code in self.source
+
+    def get(self, code, default=None):
+        if code in self:
+            return self[code]
+        return default
+
+    def __len__(self):
+        return len(self.source) + len(self.overlay)
+
+    def items(self):
+        for code, value in self.source.items():
+            if code not in self.overlay:
+                yield code, value
+        for item in self.overlay.items():
+            yield item
+
+    def __iter__(self):
+        for code, _ in self.items():
+            yield code
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        for _, value in self.items():
+            yield value
+
+    def copy(self):
+        """Materialized snapshot as a plain dict"""
+        return dict(self.items())